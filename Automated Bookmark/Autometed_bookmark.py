@@ -2,12 +2,40 @@ import tkinter as tk
 from tkinter import filedialog, ttk, messagebox
 from reportlab.pdfgen import canvas
 from reportlab.lib.utils import ImageReader
+from reportlab.pdfbase import pdfmetrics
 from PyPDF2 import PdfReader, PdfWriter
+from PyPDF2.generic import ArrayObject, DecodedStreamObject, DictionaryObject, NameObject
 from io import BytesIO
+from functools import lru_cache
+from collections import namedtuple
 import os
+import sys
+import csv
+import json
+import time
+import argparse
 
 PAGE_WIDTH = 612  # 8.5 inch
 PAGE_HEIGHT = 766.8  # 10.65 inch
+# In the pptx the 1st chapter's tab is at (10.65-0.7)*72 = 610 pt; each next chapter is 31.68 pt lower
+TAB_TOP_Y = 610
+TAB_STEP_Y = 31.68
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# Vector tabs, drawn to the size of left.png/right.png at 0.2 scale
+TAB_WIDTH = 28.2
+TAB_HEIGHT = 109.6
+TAB_FONT_NAME = "TiroBangla"
+TAB_FONT_FILE = os.path.join(SCRIPT_DIR, "TiroBangla-Regular.ttf")
+TAB_MAX_FONT_SIZE = 11
+TAB_LINE_WIDTH = 1.8
+TAB_HANGER_HEIGHT = 21.6
+
+# A tab drawn as vector art from its title, used wherever an image path is accepted
+TitleTab = namedtuple('TitleTab', ['title'])
+
+def chapter_y(chapter):
+    return TAB_TOP_Y - (chapter * TAB_STEP_Y)
 
 def create_overlay_with_image(image_path, position, y_value):
     packet = BytesIO()
@@ -29,18 +57,382 @@ def create_overlay_with_image(image_path, position, y_value):
     packet.seek(0)
     return PdfReader(packet)
 
-def stamp_pdf(input_pdf, output_pdf, left_image_path, right_image_path, y_value):
-    reader = PdfReader(input_pdf)
+SHAPING_MISSING = ("Vector tabs need text shaping for Bangla (reportlab 4.1 or newer with uharfbuzz): "
+                   "pip install -U reportlab uharfbuzz")
+
+@lru_cache(maxsize=1)
+def _tab_text_tools():
+    """
+    Registers the tab font and returns (shapeStr, title_width). Imported on
+    first use, so image tabs still work on reportlab builds without shaping.
+    """
+    try:
+        from reportlab.pdfbase.ttfonts import TTFont, shapeStr
+        import uharfbuzz as hb
+    except ImportError:
+        raise RuntimeError(SHAPING_MISSING)
+    pdfmetrics.registerFont(TTFont(TAB_FONT_NAME, TAB_FONT_FILE))
+    if not pdfmetrics.getFont(TAB_FONT_NAME).shapable:
+        # Without shaping, vowel signs and conjuncts come out in the wrong order
+        raise RuntimeError(SHAPING_MISSING)
+
+    hb_font = hb.Font(hb.Face(hb.Blob.from_file_path(TAB_FONT_FILE)))
+    upem = hb_font.face.upem
+
+    def title_width(title, font_size):
+        """Advance width of the shaped title in points."""
+        buf = hb.Buffer()
+        buf.add_str(title)
+        buf.guess_segment_properties()
+        hb.shape(hb_font, buf)
+        return sum(pos.x_advance for pos in buf.glyph_positions) * font_size / upem
+
+    return shapeStr, title_width
+
+def create_overlay_with_title(title, y_value):
+    """
+    Draws a chapter's tabs as vector art: the black hanger, a white capsule
+    and the title set sideways in Tiro Bangla, embedded as a subset. Page 1
+    is the right-hand tab and page 2 the left; being one document, both
+    share a single copy of the font. Matches left.png/right.png.
+    """
+    _tab_text_tools()
+    packet = BytesIO()
+    can = canvas.Canvas(packet, pagesize=(PAGE_WIDTH, PAGE_HEIGHT))
+    for position in ('right', 'left'):
+        _draw_title_tab(can, title, position, y_value)
+        can.showPage()
+    can.save()
+    packet.seek(0)
+    return PdfReader(packet)
+
+def _draw_title_tab(can, title, position, y_value):
+    x0 = PAGE_WIDTH - TAB_WIDTH if position == 'right' else 0
+    can.translate(x0, y_value)
+    if position == 'left':  # mirror the right-hand tab onto the binding side
+        can.translate(TAB_WIDTH, 0)
+        can.scale(-1, 1)
+
+    # Hanger across the top, square against the page edge, then the capsule over it
+    can.setFillGray(0)
+    hanger_y = TAB_HEIGHT - TAB_HANGER_HEIGHT
+    can.roundRect(0, hanger_y, TAB_WIDTH, TAB_HANGER_HEIGHT, 4, stroke=0, fill=1)
+    can.rect(TAB_WIDTH / 2, hanger_y, TAB_WIDTH / 2, TAB_HANGER_HEIGHT, stroke=0, fill=1)
+    capsule_x, capsule_y, capsule_w, capsule_h = 4.6, 1.4, 19.2, 101.7
+    can.setFillGray(1)
+    can.setStrokeGray(0)
+    can.setLineWidth(TAB_LINE_WIDTH)
+    can.roundRect(capsule_x, capsule_y, capsule_w, capsule_h, capsule_w / 2, stroke=1, fill=1)
+
+    # Title reads bottom-to-top on right pages and top-to-bottom on left ones.
+    # Shape it ourselves: the canvas only shapes when rlbidi is installed too.
+    shape_str, title_width = _tab_text_tools()
+    room = capsule_h - capsule_w * 0.8
+    width = title_width(title, TAB_MAX_FONT_SIZE)
+    font_size = TAB_MAX_FONT_SIZE
+    if width > room:
+        font_size = TAB_MAX_FONT_SIZE * room / width
+        width = room
+    shaped = shape_str(title, TAB_FONT_NAME, font_size)
+    can.translate(capsule_x + capsule_w / 2, capsule_y + capsule_h / 2)
+    if position == 'left':
+        can.scale(-1, 1)
+        can.rotate(-90)
+    else:
+        can.rotate(90)
+    can.setFillGray(0)
+    can.setFont(TAB_FONT_NAME, font_size)
+    can.drawString(-width / 2, -font_size * 0.35, shaped)
+
+@lru_cache(maxsize=32)
+def _title_overlay(title, y_value):
+    return create_overlay_with_title(title, y_value)
+
+@lru_cache(maxsize=64)
+def overlay_page(tab, position, y_value):
+    """
+    The overlay page for one tab (an image path or a TitleTab), side and tab
+    position, rendered once per process.
+    """
+    if isinstance(tab, TitleTab):
+        return _title_overlay(tab.title, y_value).pages[0 if position == 'right' else 1]
+    return create_overlay_with_image(tab, position, y_value).pages[0]
+
+def _content_stream(data):
+    stream = DecodedStreamObject()
+    stream.set_data(data)
+    return stream
+
+class TabStamper:
+    """
+    Stamps tab overlays onto the pages of one PdfWriter. Each overlay is added
+    to the output once as a Form XObject; a page only gets a resource name and
+    a tiny "q /BmTab0 Do Q" stream appended to its /Contents, so the page's own
+    content is never parsed or re-encoded (PdfPage.merge_page does both).
+    """
+
+    def __init__(self, writer):
+        self.writer = writer
+        self.forms = {}  # (tab, position, y_value) -> (name, form, draw stream)
+        # Wraps the page's own content so its graphics state can't leak into the tab
+        self.save_state = writer._add_object(_content_stream(b"q\n"))
+
+    def _form(self, tab, position, y_value):
+        key = (tab, position, y_value)
+        if key not in self.forms:
+            overlay = overlay_page(tab, position, y_value)
+            form = _content_stream(overlay.get_contents().get_data())
+            form[NameObject("/Type")] = NameObject("/XObject")
+            form[NameObject("/Subtype")] = NameObject("/Form")
+            form[NameObject("/BBox")] = overlay.mediabox
+            form[NameObject("/Resources")] = overlay["/Resources"].clone(self.writer)
+            name = NameObject(f"/BmTab{len(self.forms)}")
+            draw = _content_stream(f"\nQ q {name} Do Q\n".encode())
+            self.forms[key] = (name, self.writer._add_object(form), self.writer._add_object(draw))
+        return self.forms[key]
+
+    def stamp(self, page, tab, position, y_value):
+        """Draws the overlay on `page`, which must already belong to the writer."""
+        name, form, draw = self._form(tab, position, y_value)
+        # Copy the resource dicts: pages often share them, and the other pages
+        # may carry a different tab. The values stay shared references.
+        resources = DictionaryObject(page.get("/Resources", DictionaryObject()).get_object())
+        xobjects = DictionaryObject(resources.get("/XObject", DictionaryObject()).get_object())
+        xobjects[name] = form
+        resources[NameObject("/XObject")] = xobjects
+        page[NameObject("/Resources")] = resources
+
+        contents = page.get("/Contents")
+        if contents is None:
+            parts = []
+        elif isinstance(contents.get_object(), ArrayObject):
+            parts = list(contents.get_object())
+        else:
+            parts = [contents]
+        page[NameObject("/Contents")] = ArrayObject([self.save_state] + parts + [draw])
+
+def _write_stamped(reader, output_pdf, page_tabs):
+    """
+    Copies every page of `reader`, stamping page i (0-based) when `page_tabs[i]`
+    gives its (y_value, left_tab, right_tab). The PdfWriter holds every page
+    until the final write, so memory grows with the size of the PDF.
+    """
     writer = PdfWriter()
+    stamper = TabStamper(writer)
     for i, page in enumerate(reader.pages):
+        page = writer.add_page(page)
+        if i not in page_tabs:
+            continue
+        y_value, left_tab, right_tab = page_tabs[i]
         pos = 'right' if (i + 1) % 2 == 1 else 'left'
-        image_path = right_image_path if pos == 'right' else left_image_path
-        overlay = create_overlay_with_image(image_path, pos, y_value)
-        page.merge_page(overlay.pages[0])
-        writer.add_page(page)
+        stamper.stamp(page, right_tab if pos == 'right' else left_tab, pos, y_value)
     with open(output_pdf, "wb") as f_out:
         writer.write(f_out)
 
+def stamp_pdf(input_pdf, output_pdf, left_image_path, right_image_path, y_value):
+    """Stamps every page; the two "image paths" may also be TitleTabs."""
+    reader = PdfReader(input_pdf)
+    tabs = (y_value, left_image_path, right_image_path)
+    _write_stamped(reader, output_pdf, {i: tabs for i in range(len(reader.pages))})
+
+def stamp_book(input_pdf, output_pdf, left_image_path, right_image_path, chapter_pages):
+    """
+    Stamps a merged book, each chapter's pages at that chapter's tab
+    position. `chapter_pages` holds (chapter, first_page, last_page, title)
+    with 1-based inclusive pages; chapters with a title get a vector tab, the
+    rest the images. Pages outside every range are copied unstamped. The book
+    is read once, but the whole output is built in memory before it is written.
+    """
+    reader = PdfReader(input_pdf)
+    page_count = len(reader.pages)
+    page_tabs = {}
+    for chapter, first, last, title in chapter_pages:
+        if not 1 <= first <= last <= page_count:
+            raise ValueError(f"Chapter {chapter}: pages {first}-{last} are outside the book's {page_count} pages")
+        tabs = chapter_tabs(chapter, title, left_image_path, right_image_path)
+        for i in range(first - 1, last):
+            if i in page_tabs:
+                raise ValueError(f"Page {i + 1} is listed under more than one chapter")
+            page_tabs[i] = tabs
+    _write_stamped(reader, output_pdf, page_tabs)
+
+def chapter_tabs(chapter, title, left_image_path, right_image_path):
+    """(y_value, left_tab, right_tab) for a chapter: vector when titled, else the images."""
+    if title:
+        return chapter_y(chapter), TitleTab(title), TitleTab(title)
+    if not (left_image_path and right_image_path):
+        raise ValueError(f"Chapter {chapter} has no title, so the LEFT and RIGHT images are needed")
+    return chapter_y(chapter), left_image_path, right_image_path
+
+# --- Chapter manifests ---
+
+def parse_page_range(text):
+    """"12-30" -> (12, 30); a single page "12" -> (12, 12)."""
+    first, sep, last = text.replace("–", "-").partition("-")
+    first = int(first)
+    return first, (int(last) if sep else first)
+
+def load_manifest(path):
+    """
+    Reads a chapter manifest: a .csv with chapter,pages,file,title columns or a
+    .json list of {"chapter": 7, "pages": "120-141"} / {"chapter": 7, "file": "ch07.pdf"}
+    objects. Every entry gives either a page range of one merged book or a
+    chapter PDF (relative to the manifest's folder), and all entries must
+    use the same kind; an optional title draws that chapter's tab as vector
+    art. Returns (chapter, (first, last) or None, file or None, title) tuples.
+    """
+    base = os.path.dirname(os.path.abspath(path))
+    if path.lower().endswith(".json"):
+        with open(path, encoding="utf-8") as f:
+            rows = json.load(f)
+    else:
+        with open(path, newline="", encoding="utf-8-sig") as f:
+            rows = list(csv.DictReader(f))
+
+    entries = []
+    for n, row in enumerate(rows, 1):
+        chapter = str(row.get("chapter", "")).strip()
+        pages = str(row.get("pages") or "").strip()
+        file = str(row.get("file") or "").strip()
+        title = str(row.get("title") or "").strip() or None
+        if not chapter.isdigit() or bool(pages) == bool(file):
+            raise ValueError(f"{os.path.basename(path)}, entry {n}: needs a chapter number and either pages or file")
+        try:
+            page_range = parse_page_range(pages) if pages else None
+        except ValueError:
+            raise ValueError(f"{os.path.basename(path)}, entry {n}: bad page range {pages!r}")
+        entries.append((int(chapter), page_range, os.path.join(base, file) if file else None, title))
+
+    if len({entry[1] is None for entry in entries}) > 1:
+        raise ValueError(f"{os.path.basename(path)} mixes page ranges and chapter files")
+    return entries
+
+def stamp_manifest(manifest_path, output, left_image_path, right_image_path, book_pdf=None, workers=None):
+    """
+    Stamps everything a manifest lists. Page-range manifests stamp `book_pdf`
+    into the single file `output`; file manifests stamp each chapter PDF into
+    the folder `output`, in parallel. Returns (input, output, seconds, error) rows.
+    """
+    entries = load_manifest(manifest_path)
+    if entries and entries[0][1] is not None:
+        if not book_pdf:
+            raise ValueError("This manifest lists page ranges; choose the merged book PDF to stamp")
+        start = time.perf_counter()
+        stamp_book(book_pdf, output, left_image_path, right_image_path,
+                   [(chapter, first, last, title) for chapter, (first, last), _, title in entries])
+        return [(book_pdf, output, round(time.perf_counter() - start, 2), None)]
+
+    os.makedirs(output, exist_ok=True)
+    outputs = chapter_output_paths([(chapter, input_pdf) for chapter, _, input_pdf, _ in entries], output)
+    jobs = []
+    for (chapter, _, input_pdf, title), output_pdf in zip(entries, outputs):
+        y_value, left_tab, right_tab = chapter_tabs(chapter, title, left_image_path, right_image_path)
+        jobs.append((input_pdf, output_pdf, left_tab, right_tab, y_value))
+    return stamp_batch(jobs, workers)
+
+def chapter_output_paths(chapter_files, out_dir):
+    """
+    Output path of each (chapter, input PDF), named <chapter>_<stem>_stamped.pdf
+    so same-named chapter files (ch07/main.pdf, ch08/main.pdf) never
+    overwrite each other. Raises ValueError if two would still collide.
+    """
+    outputs, seen = [], {}
+    for chapter, input_pdf in chapter_files:
+        stem = os.path.splitext(os.path.basename(input_pdf))[0]
+        output_pdf = os.path.join(out_dir, f"{chapter:02d}_{stem}_stamped.pdf")
+        key = os.path.normcase(output_pdf)
+        if key in seen:
+            raise ValueError(f"{input_pdf} and {seen[key]} would both be stamped to {output_pdf}")
+        seen[key] = input_pdf
+        outputs.append(output_pdf)
+    return outputs
+
+# --- Batch mode ---
+
+def _stamp_job(job):
+    """Process-pool entry point; returns (input, output, seconds, error)."""
+    input_pdf, output_pdf, left_image_path, right_image_path, y_value = job
+    start = time.perf_counter()
+    try:
+        stamp_pdf(input_pdf, output_pdf, left_image_path, right_image_path, y_value)
+        return input_pdf, output_pdf, round(time.perf_counter() - start, 2), None
+    except Exception as e:
+        return input_pdf, output_pdf, round(time.perf_counter() - start, 2), str(e)
+
+def stamp_batch(jobs, workers=None):
+    """
+    Stamps many chapter PDFs in parallel processes. `jobs` holds
+    (input_pdf, output_pdf, left_image_path, right_image_path, y_value) tuples.
+    """
+    from concurrent.futures import ProcessPoolExecutor
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        return list(pool.map(_stamp_job, jobs))
+
+def parse_chapter_file(value):
+    """argparse type for CHAPTER=PDF pairs, e.g. 7=chapter07.pdf."""
+    chapter, sep, path = value.partition("=")
+    if not sep or not chapter.strip().isdigit():
+        raise argparse.ArgumentTypeError(f"expected CHAPTER=PDF, got {value!r}")
+    return int(chapter), path
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Stamp chapter bookmark tabs on PDFs. Run without arguments for the GUI.")
+    parser.add_argument('files', nargs='*', type=parse_chapter_file, metavar="CHAPTER=PDF",
+                        help="Chapter number and PDF to stamp, e.g. 7=chapter07.pdf")
+    parser.add_argument('--left', default=os.path.join(SCRIPT_DIR, "left.png"), help="Tab image for even (left) pages")
+    parser.add_argument('--right', default=os.path.join(SCRIPT_DIR, "right.png"), help="Tab image for odd (right) pages")
+    parser.add_argument('--title', help="Draw vector tabs with this chapter title instead of the images; "
+                                         "{chapter} is replaced by the chapter number")
+    parser.add_argument('-m', '--manifest', help="Chapter manifest (.csv/.json) of page ranges or chapter files")
+    parser.add_argument('--book', help="Merged book PDF, for a manifest of page ranges")
+    parser.add_argument('-o', '--out-dir', default="Stamped", help="Folder for the stamped PDFs")
+    parser.add_argument('-j', '--workers', type=int, default=None, help="Parallel processes (default: CPU count)")
+    args = parser.parse_args(argv)
+
+    if not args.files and not args.manifest:
+        root = tk.Tk()
+        app = PDFStamperApp(root)
+        root.mainloop()
+        return 0
+
+    if args.title:
+        try:
+            _tab_text_tools()
+        except RuntimeError as e:
+            parser.error(str(e))
+    os.makedirs(args.out_dir, exist_ok=True)
+    start = time.perf_counter()
+    if args.manifest:
+        output = args.out_dir
+        if args.book:
+            stem = os.path.splitext(os.path.basename(args.book))[0]
+            output = os.path.join(args.out_dir, stem + "_stamped.pdf")
+        try:
+            results = stamp_manifest(args.manifest, output, args.left, args.right, args.book, args.workers)
+        except (OSError, ValueError) as e:
+            parser.error(str(e))
+    else:
+        try:
+            outputs = chapter_output_paths(args.files, args.out_dir)
+        except ValueError as e:
+            parser.error(str(e))
+        jobs = []
+        for (chapter, input_pdf), output_pdf in zip(args.files, outputs):
+            title = args.title.replace("{chapter}", str(chapter)) if args.title else None
+            y_value, left_tab, right_tab = chapter_tabs(chapter, title, args.left, args.right)
+            jobs.append((input_pdf, output_pdf, left_tab, right_tab, y_value))
+        results = stamp_batch(jobs, args.workers)
+    for input_pdf, output_pdf, seconds, error in results:
+        if error:
+            print(f"✗ {os.path.basename(input_pdf)}: {error}")
+        else:
+            print(f"✓ {os.path.basename(input_pdf)} -> {output_pdf} ({seconds}s)")
+    failed = sum(1 for result in results if result[3])
+    print(f"Stamped {len(results) - failed}/{len(results)} PDFs in {time.perf_counter() - start:.1f}s")
+    return 1 if failed else 0
+
 # GUI starts here
 class PDFStamperApp:
     def __init__(self, master):
@@ -67,7 +459,12 @@ class PDFStamperApp:
         self.chapter_dropdown = ttk.Combobox(master, textvariable=self.chapter_var, values=[i for i in range(1, 21)], width=5, state="readonly")
         self.chapter_dropdown.grid(row=3, column=1, sticky='w')
 
-        tk.Button(master, text="Stamp PDF", command=self.stamp_pdf).grid(row=4, column=1, pady=10)
+        tk.Label(master, text="Chapter title (vector tab):").grid(row=4, column=0)
+        self.title_entry = tk.Entry(master, width=40)
+        self.title_entry.grid(row=4, column=1)
+
+        tk.Button(master, text="Stamp PDF", command=self.stamp_pdf).grid(row=5, column=1, pady=10)
+        tk.Button(master, text="Stamp from Manifest...", command=self.stamp_from_manifest).grid(row=5, column=2, pady=10)
 
     def browse_pdf(self):
         file = filedialog.askopenfilename(filetypes=[("PDF files", "*.pdf")])
@@ -92,22 +489,63 @@ class PDFStamperApp:
         left_img = self.left_img_entry.get()
         right_img = self.right_img_entry.get()
         chapter = self.chapter_var.get()
-        if not all([input_pdf, left_img, right_img, chapter]):
-            messagebox.showerror("Error", "Please fill all fields!")
+        title = self.title_entry.get().strip()
+        if not all([input_pdf, chapter]) or not (title or (left_img and right_img)):
+            messagebox.showerror("Error", "Please fill all fields, or enter a chapter title instead of the images!")
             return
 
-        y_value = 610 - (chapter * 31.68)
+        y_value, left_tab, right_tab = chapter_tabs(chapter, title, left_img, right_img)
         output_pdf = filedialog.asksaveasfilename(defaultextension=".pdf", filetypes=[("PDF files", "*.pdf")])
         if not output_pdf:
             return
 
         try:
-            stamp_pdf(input_pdf, output_pdf, left_img, right_img, y_value)
+            stamp_pdf(input_pdf, output_pdf, left_tab, right_tab, y_value)
             messagebox.showinfo("Success", f"Stamped PDF saved to {os.path.basename(output_pdf)}")
         except Exception as e:
             messagebox.showerror("Error", str(e))
 
+    def stamp_from_manifest(self):
+        left_img = self.left_img_entry.get()
+        right_img = self.right_img_entry.get()
+        manifest = filedialog.askopenfilename(title="Select chapter manifest",
+                                              filetypes=[("Manifest", "*.csv;*.json")])
+        if not manifest:
+            return
+
+        try:
+            entries = load_manifest(manifest)
+            if not entries:
+                messagebox.showerror("Error", "The manifest lists no chapters.")
+                return
+            book_pdf = None
+            if entries[0][1] is not None:
+                # Page ranges: stamp the merged book chosen above into one file
+                book_pdf = self.pdf_entry.get()
+                if not book_pdf:
+                    messagebox.showerror("Error", "This manifest lists page ranges; please select the book PDF first!")
+                    return
+                output = filedialog.asksaveasfilename(defaultextension=".pdf", filetypes=[("PDF files", "*.pdf")])
+            else:
+                output = filedialog.askdirectory(title="Folder for the stamped chapters")
+            if not output:
+                return
+
+            self.master.config(cursor="wait")
+            self.master.update()
+            try:
+                results = stamp_manifest(manifest, output, left_img, right_img, book_pdf)
+            finally:
+                self.master.config(cursor="")
+        except Exception as e:
+            messagebox.showerror("Error", str(e))
+            return
+
+        errors = [f"{os.path.basename(r[0])}: {r[3]}" for r in results if r[3]]
+        if errors:
+            messagebox.showerror("Error", "Some chapters failed:\n" + "\n".join(errors))
+        else:
+            messagebox.showinfo("Success", f"Stamped {len(results)} PDF(s) to {output}")
+
 if __name__ == '__main__':
-    root = tk.Tk()
-    app = PDFStamperApp(root)
-    root.mainloop()
+    sys.exit(main())
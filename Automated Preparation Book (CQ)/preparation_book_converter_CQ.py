@@ -1,13 +1,19 @@
 import re
+import os
+import queue
+import threading
+from copy import deepcopy
+from functools import lru_cache
 import tkinter as tk
-from tkinter import filedialog, messagebox
+from tkinter import filedialog, messagebox, ttk
 from lxml import etree
 from docx import Document
 from docx.oxml.ns import qn
-from docx.oxml import parse_xml
+from docx.oxml import parse_xml, OxmlElement
+from docx.text.run import Run
+from docx.text.paragraph import Paragraph
 from docx.shared import Pt, RGBColor, Inches
 from docx.enum.text import WD_ALIGN_PARAGRAPH
-import pandas as pd
 import json
 
 # --- Constants and Configuration ---
@@ -29,7 +35,7 @@ def patch_omml_font_size(omml_xml, size_pt=FONT_SIZE):
     except etree.XMLSyntaxError:
         return omml_xml
 
-def set_bangla_font(run, font_size=FONT_SIZE, bold=False, color=None, underline=False):
+def _apply_bangla_font(run, font_size=FONT_SIZE, bold=False, color=None, underline=False):
     run.font.name = FONT_NAME
     run.element.rPr.rFonts.set(qn('w:eastAsia'), FONT_NAME)
     run.font.size = Pt(font_size)
@@ -38,6 +44,20 @@ def set_bangla_font(run, font_size=FONT_SIZE, bold=False, color=None, underline=
     if color:
         run.font.color.rgb = color
 
+@lru_cache(maxsize=None)
+def _bangla_rpr_template(font_size, bold, color, underline):
+    """The `w:rPr` that `_apply_bangla_font` produces, built once per style."""
+    run = Run(OxmlElement('w:r'), None)
+    _apply_bangla_font(run, font_size, bold, color, underline)
+    return run.element.rPr
+
+def set_bangla_font(run, font_size=FONT_SIZE, bold=False, color=None, underline=False):
+    if run.element.rPr is None:
+        # Fresh run: clone the cached properties instead of running every setter
+        run.element.insert(0, deepcopy(_bangla_rpr_template(font_size, bold, color, underline)))
+    else:
+        _apply_bangla_font(run, font_size, bold, color, underline)
+
 def split_text_and_omml(para):
     para_xml = etree.tostring(para._element, encoding='unicode')
     tree = etree.fromstring(para_xml.encode('utf-8'))
@@ -351,17 +371,48 @@ def strip_prefix_from_parts(parts, prefix_regex):
     
     return new_parts
 
+class ParagraphWriter:
+    """
+    Appends paragraphs to a document and remembers the last one (`last`), so
+    formatters can space a finished block without rescanning `doc.paragraphs`.
+    New paragraphs go straight before the trailing sectPr; `doc.add_paragraph`
+    would search the whole body for it on every call.
+    The same class lives in the MCQ converter; keep the two in sync.
+    """
+
+    def __init__(self, doc):
+        self._parent = doc._body
+        self._body = doc.element.body
+        try:
+            tail = self._body[-1]
+        except IndexError:
+            tail = None
+        self._sect_pr = tail if tail is not None and tail.tag == qn('w:sectPr') else None
+        self.last = None
+
+    def add_paragraph(self):
+        p = OxmlElement('w:p')
+        if self._sect_pr is not None:
+            self._sect_pr.addprevious(p)
+        else:
+            self._body.append(p)
+        self.last = Paragraph(p, self._parent)
+        return self.last
+
+
 def format_cq_for_docx(cq, doc, is_math=False):
     """
     Formats and writes a single CQ with precise bolding, spacing, and justify alignment.
+    Returns the CQ's last paragraph.
     """
+    out = ParagraphWriter(doc)
     q_labels = QUESTION_LABELS[:-1] if is_math else QUESTION_LABELS
 
     # 1. Stem
     stem_paras = cq.get('stem_meta', [])
     if stem_paras:
         # --- Handle the First Stem Paragraph (with special formatting) ---
-        p_stem = doc.add_paragraph()
+        p_stem = out.add_paragraph()
         p_stem.alignment = WD_ALIGN_PARAGRAPH.JUSTIFY
         
         first_para_parts = split_text_and_omml(stem_paras[0])
@@ -389,19 +440,19 @@ def format_cq_for_docx(cq, doc, is_math=False):
 
         # --- Render Subsequent Stem Paragraphs (if any) ---
         for para in stem_paras[1:]:
-            p_cont = doc.add_paragraph()
+            p_cont = out.add_paragraph()
             p_cont.alignment = WD_ALIGN_PARAGRAPH.JUSTIFY
             render_parts_to_para(p_cont, split_text_and_omml(para))
 
     # 2. Questions
     for label in q_labels:
         if label in cq.get('questions_meta', {}):
-            p_q = doc.add_paragraph()
+            p_q = out.add_paragraph()
             p_q.alignment = WD_ALIGN_PARAGRAPH.JUSTIFY
             render_parts_to_para(p_q, split_text_and_omml(cq['questions_meta'][label][0]), bold=True)
     
     # 3. Solution Header with space BEFORE
-    p_header = doc.add_paragraph()
+    p_header = out.add_paragraph()
     p_header.paragraph_format.space_before = Pt(8)
     p_header.alignment = WD_ALIGN_PARAGRAPH.JUSTIFY
     run = p_header.add_run(f"{cq['serial']} নং প্রশ্নের সমাধান")
@@ -411,7 +462,7 @@ def format_cq_for_docx(cq, doc, is_math=False):
     for label in q_labels:
         if label in cq.get('solutions_meta', {}):
             solution_paras = cq['solutions_meta'][label]
-            p_sol = doc.add_paragraph()
+            p_sol = out.add_paragraph()
             p_sol.alignment = WD_ALIGN_PARAGRAPH.JUSTIFY
             set_bangla_font(p_sol.add_run(f"{label}. "), bold=True)
             
@@ -421,26 +472,23 @@ def format_cq_for_docx(cq, doc, is_math=False):
             render_parts_to_para(p_sol, cleaned_parts)
 
             for para in solution_paras[1:]:
-                p_sol_cont = doc.add_paragraph()
+                p_sol_cont = out.add_paragraph()
                 p_sol_cont.alignment = WD_ALIGN_PARAGRAPH.JUSTIFY
                 render_parts_to_para(p_sol_cont, split_text_and_omml(para))
     
     # Add space after the entire CQ block for better separation
-    if doc.paragraphs:
-        doc.paragraphs[-1].paragraph_format.space_after = Pt(8)
+    out.last.paragraph_format.space_after = Pt(8)
+    return out.last
 
-def convert_file(src_file, out_file, is_math):
-    try:
-        doc = Document(src_file)
-    except Exception as e:
-        messagebox.showerror("File Error", f"Could not open source file.\n\n{e}")
-        return False, None
+class ConversionCancelled(Exception):
+    """Raised inside a conversion when the user presses Cancel."""
 
-    cqs = extract_cqs(doc.paragraphs, is_math)
-    if not cqs:
-        messagebox.showwarning("No CQs Found", "Could not find any CQs with the specified structure in the document.")
-        return False, None
-        
+
+def build_cq_docx(cqs, is_math, progress=None, cancel=None):
+    """
+    Builds the two-column output document. `progress(done, total)` is called
+    after each CQ; setting the `cancel` event stops with ConversionCancelled.
+    """
     outdoc = Document()
     # Set default paragraph style to Justify
     style = outdoc.styles['Normal']
@@ -453,8 +501,55 @@ def convert_file(src_file, out_file, is_math):
     cols = section._sectPr.xpath('./w:cols')[0]
     cols.set(qn('w:num'), '2'); cols.set(qn('w:space'), '210')
 
-    for cq in cqs:
+    for done, cq in enumerate(cqs, 1):
+        if cancel is not None and cancel.is_set():
+            raise ConversionCancelled()
         format_cq_for_docx(cq, outdoc, is_math)
+        if progress is not None:
+            progress(done, len(cqs))
+    return outdoc
+
+# Export format -> file extension
+EXPORT_EXTENSIONS = {'excel': ".xlsx", 'csv': ".csv", 'json': ".json"}
+
+def export_cqs(cqs, basepath, is_math, export_formats, cancel=None, written=None):
+    """
+    Writes `basepath` + extension for each format. Setting the `cancel`
+    event stops before the next file with ConversionCancelled; each path is
+    added to the `written` list as it is started.
+    """
+    # pandas takes longer to import than the rest of the script; only exports need it
+    import pandas as pd
+
+    rows = cqs_to_rows(cqs, is_math)
+    df = pd.DataFrame(rows)
+    writers = {
+        'excel': lambda path: df.to_excel(path, index=False),
+        'csv': lambda path: df.to_csv(path, index=False, encoding='utf-8-sig'),
+        'json': lambda path: df.to_json(path, orient='records', indent=2, force_ascii=False),
+    }
+    for fmt in EXPORT_EXTENSIONS:
+        if fmt in export_formats:
+            if cancel is not None and cancel.is_set():
+                raise ConversionCancelled()
+            path = basepath + EXPORT_EXTENSIONS[fmt]
+            if written is not None:
+                written.append(path)
+            writers[fmt](path)
+
+def convert_file(src_file, out_file, is_math):
+    try:
+        doc = Document(src_file)
+    except Exception as e:
+        messagebox.showerror("File Error", f"Could not open source file.\n\n{e}")
+        return False, None
+
+    cqs = extract_cqs(doc.paragraphs, is_math)
+    if not cqs:
+        messagebox.showwarning("No CQs Found", "Could not find any CQs with the specified structure in the document.")
+        return False, None
+        
+    outdoc = build_cq_docx(cqs, is_math)
         
     try:
         outdoc.save(out_file)
@@ -464,7 +559,66 @@ def convert_file(src_file, out_file, is_math):
 
     return True, cqs
 
+def convert_file_worker(src_file, out_file, is_math, export_formats, events, cancel):
+    """
+    `convert_file` plus exports for a background thread. Results go onto the
+    `events` queue, since only the Tk main loop may show messageboxes:
+    ("progress", done, total) and ("status", text), then one of ("done", basepath),
+    ("cancelled",), ("warning", title, message) or ("error", title, message).
+    A cancelled conversion leaves no output behind: the event is checked
+    before the save and each export, and files already written are removed.
+    """
+    written = []
+    try:
+        events.put(("status", "Reading source file..."))
+        try:
+            doc = Document(src_file)
+        except Exception as e:
+            events.put(("error", "File Error", f"Could not open source file.\n\n{e}"))
+            return
+
+        cqs = extract_cqs(doc.paragraphs, is_math)
+        if not cqs:
+            events.put(("warning", "No CQs Found", "Could not find any CQs with the specified structure in the document."))
+            return
+
+        outdoc = build_cq_docx(
+            cqs, is_math,
+            progress=lambda done, total: events.put(("progress", done, total)),
+            cancel=cancel)
+        if cancel.is_set():
+            raise ConversionCancelled()
+        events.put(("status", "Saving..."))
+        try:
+            outdoc.save(out_file)
+        except Exception as e:
+            events.put(("error", "Save Error", f"Could not save output DOCX file.\n\n{e}"))
+            return
+        written.append(out_file)
+
+        basepath = out_file.rsplit('.', 1)[0]
+        if cancel.is_set():
+            raise ConversionCancelled()
+        events.put(("status", "Exporting..."))
+        export_cqs(cqs, basepath, is_math, export_formats, cancel, written)
+        events.put(("done", basepath))
+    except ConversionCancelled:
+        remove_files(written)
+        events.put(("cancelled",))
+    except Exception as e:
+        events.put(("error", "Conversion Error", f"Conversion failed.\n\n{e}"))
+
+def remove_files(paths):
+    """Deletes the outputs of a cancelled conversion, ignoring any that were never written."""
+    for path in paths:
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
 # --- Tkinter GUI ---
+POLL_INTERVAL_MS = 100  # how often the window drains the worker's event queue
+
 def main_gui():
     def select_input():
         filename = filedialog.askopenfilename(title="Select Source DOCX file", filetypes=[("Word Files", "*.docx")])
@@ -483,19 +637,64 @@ def main_gui():
             messagebox.showwarning("Input Needed", "Please select both input and output files!")
             return
         
-        root.config(cursor="wait"); root.update()
+        export_formats = [fmt for fmt, var in (('excel', var_excel), ('csv', var_csv), ('json', var_json)) if var.get()]
+
+        events = queue.Queue()
+        cancel = threading.Event()
+        job.update(events=events, cancel=cancel)
+        process_button.config(state=tk.DISABLED)
+        cancel_button.config(state=tk.NORMAL)
+        progress_bar.config(value=0, maximum=1)
+        status_var.set("Starting...")
+        threading.Thread(
+            target=convert_file_worker,
+            args=(src_file, out_file, is_math_subject, export_formats, events, cancel),
+            daemon=True,
+        ).start()
+        root.after(POLL_INTERVAL_MS, poll_events)
+
+    def cancel_conversion():
+        if job.get("cancel") is not None:
+            job["cancel"].set()
+            cancel_button.config(state=tk.DISABLED)
+            status_var.set("Cancelling...")
+
+    def poll_events():
+        events = job["events"]
         try:
-            ok, cqs_data = convert_file(src_file, out_file, is_math_subject)
-            if ok and cqs_data:
-                basepath = out_file.rsplit('.', 1)[0]
-                rows = cqs_to_rows(cqs_data, is_math_subject)
-                df = pd.DataFrame(rows)
-                if var_excel.get(): df.to_excel(basepath + ".xlsx", index=False)
-                if var_csv.get(): df.to_csv(basepath + ".csv", index=False, encoding='utf-8-sig')
-                if var_json.get(): df.to_json(basepath + ".json", orient='records', indent=2, force_ascii=False)
-                messagebox.showinfo("Success!", f"Successfully converted and exported CQ data!\n\nFiles saved with base name: {basepath}")
-        finally:
-            root.config(cursor="")
+            while True:
+                event = events.get_nowait()
+                if event[0] == "progress":
+                    done, total = event[1], event[2]
+                    progress_bar.config(value=done, maximum=max(total, 1))
+                    status_var.set(f"Formatting CQ {done} of {total}")
+                elif event[0] == "status":
+                    status_var.set(event[1])
+                else:
+                    finish_conversion(event)
+                    return
+        except queue.Empty:
+            pass
+        root.after(POLL_INTERVAL_MS, poll_events)
+
+    def finish_conversion(event):
+        job.clear()
+        process_button.config(state=tk.NORMAL)
+        cancel_button.config(state=tk.DISABLED)
+        if event[0] == "done":
+            status_var.set("Done.")
+            messagebox.showinfo("Success!", f"Successfully converted and exported CQ data!\n\nFiles saved with base name: {event[1]}")
+        elif event[0] == "cancelled":
+            progress_bar.config(value=0)
+            status_var.set("Cancelled.")
+        elif event[0] == "warning":
+            status_var.set("Nothing to convert.")
+            messagebox.showwarning(event[1], event[2])
+        else:
+            status_var.set("Failed.")
+            messagebox.showerror(event[1], event[2])
+
+    job = {}
 
     root = tk.Tk()
     root.title("CQ Sheet Formatter & Exporter")
@@ -524,7 +723,15 @@ def main_gui():
     tk.Checkbutton(options_frame, text="CSV (.csv)", variable=var_csv).grid(row=2, column=1, sticky="w")
     tk.Checkbutton(options_frame, text="JSON (.json)", variable=var_json).grid(row=2, column=2, sticky="w")
 
-    tk.Button(root, text="Process CQ File", command=run_conversion, bg="#13825c", fg="white", width=20, height=2, font=("Arial", 10, "bold")).grid(row=3, column=1, columnspan=2, pady=15)
+    process_button = tk.Button(root, text="Process CQ File", command=run_conversion, bg="#13825c", fg="white", width=20, height=2, font=("Arial", 10, "bold"))
+    process_button.grid(row=3, column=1, columnspan=2, pady=(15, 5))
+    cancel_button = tk.Button(root, text="Cancel", command=cancel_conversion, state=tk.DISABLED, width=10)
+    cancel_button.grid(row=3, column=3, pady=(15, 5))
+
+    progress_bar = ttk.Progressbar(root, orient="horizontal", mode="determinate", length=420)
+    progress_bar.grid(row=4, column=1, columnspan=2, padx=5, pady=5)
+    status_var = tk.StringVar(value="Ready.")
+    tk.Label(root, textvariable=status_var).grid(row=5, column=1, columnspan=2, pady=(0, 10))
 
     root.mainloop()
 
@@ -1,13 +1,30 @@
 import re
+import os
+import sys
+import csv
+import glob
+import time
+import zipfile
+import queue
+import hashlib
+import argparse
+import threading
+from io import BytesIO
+from copy import deepcopy
+from collections import namedtuple, OrderedDict
+from functools import lru_cache, wraps
 import tkinter as tk
-from tkinter import filedialog, messagebox
+from tkinter import filedialog, messagebox, ttk
 from lxml import etree
 from docx import Document
 from docx.oxml.ns import qn
-from docx.oxml import parse_xml
+from docx.oxml import parse_xml, OxmlElement
+from docx.text.run import Run
+from docx.text.paragraph import Paragraph
 from docx.shared import Pt, RGBColor, Inches
-import pandas as pd
 import json
+# numpy, fontTools, openpyxl and the process pool are imported where they are
+# used, so the window is not kept waiting for modules only a conversion needs.
 
 # --- Constants and Configuration ---
 FONT_NAME = "Tiro Bangla"
@@ -21,6 +38,18 @@ LONG_OPTION_CHAR_LIMIT = 1000
 OMML_WEIGHT_SHORT = 4
 OMML_WEIGHT_MEDIUM = 12
 OMML_WEIGHT_LONG = 1000
+TAB_STOPS_ONELINE = [Inches(0.8), Inches(1.6), Inches(2.4)]
+TAB_STOPS_TWOLINE = [Inches(1.6)]
+# Rendered-width layout: an option must end this far before the next tab stop
+OPTION_TAB_GAP_PT = 4
+ONELINE_OPTION_WIDTH_PT = TAB_STOPS_ONELINE[0].pt - OPTION_TAB_GAP_PT
+TWOLINE_OPTION_WIDTH_PT = TAB_STOPS_TWOLINE[0].pt - OPTION_TAB_GAP_PT
+MATH_SCRIPT_SCALE = 0.7  # Word sets sub/superscripts and radical degrees at ~70%
+MATH_OPERATORS = frozenset("=<>≤≥≠≈∈∉⊂⊆∪∩+-−±×÷→⇒")
+MATH_OPERATOR_SPACE_EM = 0.5  # space Word puts around a relation or binary operator
+FONT_FILES = {'regular': "TiroBangla-Regular.ttf", 'italic': "TiroBangla-Italic.ttf"}
+# The Tiro Bangla files ship with the bookmark stamper
+FONT_DIRS = ["", os.path.join("..", "..", "Automated Bookmark")]
 ROMAN_NUMERALS = ['i.', 'ii.', 'iii.', 'iv.', 'v.', 'vi.', 'vii.', 'viii.', 'ix.', 'x.']
 
 # --- Core Functions ---
@@ -36,6 +65,62 @@ def clean_text(text):
     text = re.sub(r'\s*([(\[\{«“‘])\s*', r'\1', text)
     return text.strip()
 
+class OmmlMemo:
+    """
+    Bounded LRU memo shared by the OMML string transforms. The same equations
+    (1/2, π, ...) repeat hundreds of times per chapter, so each result is kept
+    under (transform, digest of the OMML string, extra args) and the least
+    recently used entries are evicted once the cached results exceed
+    `max_bytes`. `stats` holds per-transform hit/miss counters.
+    """
+
+    def __init__(self, max_bytes=32 * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self.stats = {}
+        self._entries = OrderedDict()
+        self._size = 0
+
+    def __call__(self, func):
+        name = func.__name__
+        counters = self.stats[name] = {'hits': 0, 'misses': 0}
+
+        @wraps(func)
+        def memoized(omml_xml, *args, **kwargs):
+            digest = hashlib.blake2b(omml_xml.encode('utf-8'), digest_size=16).digest()
+            key = (name, digest, args, tuple(sorted(kwargs.items())))
+            if key in self._entries:
+                counters['hits'] += 1
+                self._entries.move_to_end(key)
+                return self._entries[key][0]
+            counters['misses'] += 1
+            result = func(omml_xml, *args, **kwargs)
+            # Key overhead plus the cached string; other results (ints,
+            # elements) are sized by the OMML they were built from.
+            size = 128 + (len(result) if isinstance(result, str) else len(omml_xml))
+            self._store(key, result, size)
+            return result
+        return memoized
+
+    def _store(self, key, result, size):
+        self._entries[key] = (result, size)
+        self._size += size
+        while self._size > self.max_bytes and self._entries:
+            _, (_, evicted_size) = self._entries.popitem(last=False)
+            self._size -= evicted_size
+
+    def totals(self):
+        """Returns (hits, misses) summed over every transform."""
+        return (sum(c['hits'] for c in self.stats.values()),
+                sum(c['misses'] for c in self.stats.values()))
+
+    def clear(self):
+        self._entries.clear()
+        self._size = 0
+
+
+OMML_MEMO = OmmlMemo()
+
+@OMML_MEMO
 def patch_omml_font_size(omml_xml, size_pt=FONT_SIZE):
     """Sets a consistent font size for OMML (equation) elements."""
     try:
@@ -48,8 +133,27 @@ def patch_omml_font_size(omml_xml, size_pt=FONT_SIZE):
     except etree.XMLSyntaxError:
         return omml_xml
 
-def set_bangla_font(run, font_size=FONT_SIZE, bold=False, color=None):
-    """Applies standard Bangla font styling to a run."""
+@OMML_MEMO
+def omml_run_template(omml_xml):
+    """
+    Builds the font-patched `<w:r>` holding an equation, once per distinct
+    OMML. Callers must append a deepcopy, never the template itself.
+    """
+    return parse_xml(
+        '<w:r xmlns:w="http://schemas.openxmlformats.org/wordprocessingml/2006/main" '
+        'xmlns:m="http://schemas.openxmlformats.org/officeDocument/2006/math">' +
+        patch_omml_font_size(omml_xml) +
+        '</w:r>'
+    )
+
+class OmmlXml(str):
+    """
+    An OMML part's XML string that also carries its ready-to-copy `<w:r>`
+    template in `.run`. Being a str, the string transforms and the memo
+    keys treat it exactly like the plain XML.
+    """
+
+def _apply_bangla_font(run, font_size=FONT_SIZE, bold=False, color=None):
     run.font.name = FONT_NAME
     run.element.rPr.rFonts.set(qn('w:eastAsia'), FONT_NAME)
     run.font.size = Pt(font_size)
@@ -57,53 +161,94 @@ def set_bangla_font(run, font_size=FONT_SIZE, bold=False, color=None):
     if color:
         run.font.color.rgb = color
 
+@lru_cache(maxsize=None)
+def _bangla_rpr_template(font_size, bold, color):
+    """The `w:rPr` that `_apply_bangla_font` produces, built once per style."""
+    run = Run(OxmlElement('w:r'), None)
+    _apply_bangla_font(run, font_size, bold, color)
+    return run.element.rPr
+
+def set_bangla_font(run, font_size=FONT_SIZE, bold=False, color=None):
+    """Applies standard Bangla font styling to a run."""
+    if run.element.rPr is None:
+        # Fresh run: clone the cached properties instead of running every setter
+        run.element.insert(0, deepcopy(_bangla_rpr_template(font_size, bold, color)))
+    else:
+        _apply_bangla_font(run, font_size, bold, color)
+
+def snapshot_paragraphs(doc):
+    """
+    Materializes the document body into an indexed paragraph table, once.
+    python-docx rebuilds every Paragraph proxy on each `doc.paragraphs` access,
+    so extraction, formatting and the non-MCQ copy path all index this list.
+    """
+    return list(doc.paragraphs)
+
+# One immutable parsed record per source paragraph. `parts` holds the
+# ("text", str) / ("omml", xml) pairs, `offsets` the position of each part in
+# the paragraph's run text, `full_text` all w:t text (for prefix matching),
+# `line` the plain text incl. equations and `text` python-docx's para.text.
+ParaRecord = namedtuple('ParaRecord', ['text', 'full_text', 'line', 'parts', 'offsets'])
+
+def parse_paragraph(para):
+    """Parses a paragraph's XML once into a ParaRecord."""
+    ns = {'w': 'http://schemas.openxmlformats.org/wordprocessingml/2006/main'}
+    p = para._element
+    full_text = "".join(p.xpath('.//w:t/text()'))
+    parts, offsets, line = [], [], ""
+    offset = 0
+    for node in p.iterchildren():
+        if node.tag.endswith('r'):  # A text run
+            run_text = "".join(t.text or "" for t in node.iterfind('.//w:t', namespaces=ns))
+            if run_text:
+                parts.append(("text", run_text))
+                offsets.append(offset)
+                offset += len(run_text)
+                line += run_text
+        elif node.tag.endswith(('oMath', 'oMathPara')):  # An equation
+            omml = OmmlXml(etree.tostring(node, encoding='unicode'))
+            omml.run = omml_run_template(omml)
+            parts.append(("omml", omml))
+            offsets.append(offset)
+            line += _omml_node_text(node)
+    return ParaRecord(para.text, full_text, line.strip(), tuple(parts), tuple(offsets))
+
+def build_paragraph_ir(doc):
+    """Parses every body paragraph once; all later stages index this table."""
+    return [parse_paragraph(p) for p in snapshot_paragraphs(doc)]
+
+@lru_cache(maxsize=None)
+def label_prefix_regex(label):
+    """Compiled (and cached) pattern for a label prefix like 'ক.', '(ক)', 'উত্তর:' etc."""
+    return re.compile(r'^\s*[\(\[]?\s*%s\s*[\.\)\]\।:ঃ]?\s*' % re.escape(label), re.IGNORECASE)
+
 def split_text_and_omml(para, strip_label_prefix=None):
     """
-    Splits a paragraph into a list of text and OMML parts.
+    Splits a paragraph (or its ParaRecord) into a list of text and OMML parts.
     Robustly strips a prefix, even if it's split across multiple text runs.
     """
-    para_xml = etree.tostring(para._element, encoding='unicode')
-    tree = etree.fromstring(para_xml.encode('utf-8'))
-    ns = {'w': 'http://schemas.openxmlformats.org/wordprocessingml/2006/main'}
-    parts = []
+    record = para if isinstance(para, ParaRecord) else parse_paragraph(para)
 
-    # Get the full text to reliably find the prefix
-    full_text = "".join(tree.xpath('.//w:t/text()', namespaces=ns))
-    
     chars_to_skip = 0
     if strip_label_prefix:
-        # This regex handles prefixes like 'ক.', '(ক)', 'উত্তর:' etc.
-        regex_pattern = r'^\s*[\(\[]?\s*%s\s*[\.\)\]\।:ঃ]?\s*' % re.escape(strip_label_prefix)
-        regex = re.compile(regex_pattern, re.IGNORECASE)
-        match = regex.match(full_text)
+        match = label_prefix_regex(strip_label_prefix).match(record.full_text)
         if match:
             # Calculate how many characters of the raw text to skip
             chars_to_skip = len(match.group(0))
+    if not chars_to_skip:
+        return list(record.parts)
 
-    for node in tree.iterchildren():
-        if node.tag.endswith('r'):  # A text run
-            run_text_nodes = node.findall('.//w:t', namespaces=ns)
-            for t in run_text_nodes:
-                if chars_to_skip > 0 and t.text:
-                    if len(t.text) <= chars_to_skip:
-                        chars_to_skip -= len(t.text)
-                        t.text = ""
-                    else:
-                        t.text = t.text[chars_to_skip:]
-                        chars_to_skip = 0
-            
-            final_run_text = "".join(t.text or "" for t in run_text_nodes)
-            if final_run_text:
-                parts.append(("text", final_run_text))
-        
-        elif node.tag.endswith(('oMath', 'oMathPara')):  # An equation
-            if chars_to_skip > 0:
-                # This indicates an equation is part of a label, which is unlikely.
-                # We'll stop skipping characters to avoid deleting an equation.
-                chars_to_skip = 0
-            omml_xml = etree.tostring(node, encoding='unicode')
-            parts.append(("omml", omml_xml))
-
+    # Cut the prefix using the run offsets instead of editing a reparsed copy
+    parts = []
+    for (ctype, cvalue), offset in zip(record.parts, record.offsets):
+        if ctype == "omml":
+            # An equation is never part of a label; stop skipping here.
+            chars_to_skip = 0
+        elif offset < chars_to_skip:
+            cvalue = cvalue[chars_to_skip - offset:]
+            if not cvalue:
+                continue
+        parts.append((ctype, cvalue))
     return parts
 
 
@@ -124,30 +269,144 @@ def render_parts_to_para(para, parts, bold=False, color=None):
             run = para.add_run(cvalue)
             set_bangla_font(run, bold=bold, color=color)
         elif ctype == "omml":
-            omml_patched = patch_omml_font_size(cvalue)
-            omml_run = parse_xml(
-                '<w:r xmlns:w="http://schemas.openxmlformats.org/wordprocessingml/2006/main" '
-                'xmlns:m="http://schemas.openxmlformats.org/officeDocument/2006/math">' +
-                omml_patched +
-                '</w:r>'
-            )
-            para._p.append(omml_run)
+            # Parsed and font-patched once per equation; each use is a copy
+            template = getattr(cvalue, 'run', None)
+            if template is None:
+                template = omml_run_template(cvalue)
+            para._p.append(deepcopy(template))
     para.paragraph_format.space_after = Pt(0)
     para.paragraph_format.space_before = Pt(0)
 
 
+# --- Font Metrics ---
+
+@lru_cache(maxsize=1)
+def _numpy():
+    """NumPy, imported on first use; only a conversion needs it."""
+    import numpy
+    return numpy
+
+class GlyphAdvances:
+    """
+    Advance widths of one TTF in ems, held in a float32 array indexed by code
+    point, so measuring a string is one O(len) gather. Code points the font
+    lacks use its .notdef width.
+    """
+
+    def __init__(self, path):
+        from fontTools.ttLib import TTFont
+
+        np = _numpy()
+        font = TTFont(path, lazy=True)
+        try:
+            units = float(font['head'].unitsPerEm)
+            hmtx = font['hmtx']
+            cmap = font.getBestCmap()
+            notdef = hmtx['.notdef'][0] if '.notdef' in hmtx.metrics else units / 2
+            # One extra slot past the highest mapped code point catches everything beyond it
+            self.advances = np.full(max(cmap) + 2, notdef / units, dtype=np.float32)
+            for code_point, glyph in cmap.items():
+                self.advances[code_point] = hmtx[glyph][0] / units
+        finally:
+            font.close()
+
+    def width(self, text, size_pt=FONT_SIZE):
+        """Width of `text` in points, ignoring kerning and conjunct shaping."""
+        if not text:
+            return 0.0
+        np = _numpy()
+        codes = np.frombuffer(text.encode('utf-32-le'), dtype=np.uint32)
+        return float(self.advances[np.minimum(codes, len(self.advances) - 1)].sum()) * size_pt
+
+def _find_font_file(filename):
+    try:
+        script_dir = os.path.dirname(os.path.abspath(__file__))
+    except NameError:
+        script_dir = os.getcwd()
+    for folder in FONT_DIRS:
+        path = os.path.normpath(os.path.join(script_dir, folder, filename))
+        if os.path.isfile(path):
+            return path
+    return None
+
+@lru_cache(maxsize=1)
+def load_font_metrics():
+    """Loads the Tiro Bangla advances once; None when fontTools or the fonts are missing."""
+    metrics = {}
+    for style, filename in FONT_FILES.items():
+        path = _find_font_file(filename)
+        if path is None:
+            return None
+        try:
+            metrics[style] = GlyphAdvances(path)
+        except ImportError:  # fontTools is optional: layouts fall back to character counts
+            return None
+    return metrics
+
+_M = '{http://schemas.openxmlformats.org/officeDocument/2006/math}'
+
+def _omml_node_width(node, metrics, size_pt):
+    """Approximate rendered width of an OMML node; math text is set in italic."""
+    def width(child, scale=1.0):
+        return 0.0 if child is None else _omml_node_width(child, metrics, size_pt * scale)
+
+    tag = node.tag
+    if tag == _M + 't':
+        text = node.text or ''
+        spacing = sum(1 for ch in text if ch in MATH_OPERATORS) * MATH_OPERATOR_SPACE_EM * size_pt
+        return metrics['italic'].width(text, size_pt) + spacing
+    if tag == _M + 'f':  # stacked: the wider of numerator and denominator, plus the bar overhang
+        return max(width(node.find(_M + 'num')), width(node.find(_M + 'den'))) + 0.2 * size_pt
+    if tag in (_M + 'sSup', _M + 'sSub'):
+        script = node.find(_M + ('sup' if tag == _M + 'sSup' else 'sub'))
+        return width(node.find(_M + 'e')) + width(script, MATH_SCRIPT_SCALE)
+    if tag == _M + 'sSubSup':
+        return width(node.find(_M + 'e')) + max(width(node.find(_M + 'sub'), MATH_SCRIPT_SCALE),
+                                               width(node.find(_M + 'sup'), MATH_SCRIPT_SCALE))
+    if tag == _M + 'rad':  # radical sign + optional degree + radicand
+        return 0.6 * size_pt + width(node.find(_M + 'deg'), MATH_SCRIPT_SCALE) + width(node.find(_M + 'e'))
+    if tag == _M + 'd':  # delimiters on both sides, separators between elements
+        elements = node.findall(_M + 'e')
+        return sum(width(e) for e in elements) + (0.8 + 0.3 * max(len(elements) - 1, 0)) * size_pt
+    return sum(width(child) for child in node)
+
+@OMML_MEMO
+def omml_rendered_width(omml_xml, size_pt=FONT_SIZE):
+    """Approximate width in points of an equation; needs `load_font_metrics()`."""
+    try:
+        return _omml_node_width(etree.fromstring(omml_xml), load_font_metrics(), size_pt)
+    except Exception:
+        return float(TWOLINE_OPTION_WIDTH_PT)  # unmeasurable: never let it share a line
+
+def _option_rendered_width(para, label, metrics):
+    """Rendered width in points of an option, including its bold "ক. " label."""
+    # The source label is stripped; `format_mcq` draws the Bangla one instead
+    bn_label = label
+    if label in OPTION_LABELS_EN:
+        bn_label = OPTION_LABELS_BN[OPTION_LABELS_EN.index(label) % len(OPTION_LABELS_BN)]
+    total = metrics['regular'].width(f"{bn_label}. ")
+    for ctype, cval in split_text_and_omml(para, strip_label_prefix=label):
+        if ctype == "text":
+            total += metrics['regular'].width(cval)
+        elif ctype == "omml":
+            total += omml_rendered_width(cval)
+    return total
+
 # --- Length Calculation and Parsing Functions ---
 
+def _omml_node_text(node):
+    # get all math 't' (text) nodes
+    math_texts = node.findall('.//{http://schemas.openxmlformats.org/officeDocument/2006/math}t')
+    return ''.join([t.text or '' for t in math_texts])
+
+@OMML_MEMO
 def omml_to_text(omml_xml):
     try:
-        tree = etree.fromstring(omml_xml)
-        # get all math 't' (text) nodes
-        math_texts = tree.findall('.//{http://schemas.openxmlformats.org/officeDocument/2006/math}t')
-        text = ''.join([t.text or '' for t in math_texts])
-        return text
+        return _omml_node_text(etree.fromstring(omml_xml))
     except Exception:
         return ""
 
+@OMML_MEMO
 def _omml_visible_length(omml_xml):
     try:
         tree = etree.fromstring(omml_xml)
@@ -180,40 +439,120 @@ def get_option_length_class(options_dict):
     if all(l <= MEDIUM_OPTION_CHAR_LIMIT for l in lens): return "twoline"
     return "fourline"
 
+def option_length_matrix(mcqs):
+    """
+    Effective lengths of every option of every MCQ in one sweep over the
+    paragraph IR. Returns (lengths, present): int32 and bool arrays of shape
+    (n_mcqs, 4), widened if a sheet mixes Bangla and English labels.
+    """
+    np = _numpy()
+    width = max([4] + [len(mcq['options_meta']) for mcq in mcqs])
+    lengths = np.zeros((len(mcqs), width), dtype=np.int32)
+    present = np.zeros((len(mcqs), width), dtype=bool)
+    for row, mcq in enumerate(mcqs):
+        for col, (label, (para, _)) in enumerate(mcq['options_meta'].items()):
+            if para:
+                lengths[row, col] = _option_effective_length(para, label)
+                present[row, col] = True
+    return lengths, present
+
+def option_width_matrix(mcqs, metrics):
+    """Like `option_length_matrix`, but with rendered widths in points (float32)."""
+    np = _numpy()
+    width = max([4] + [len(mcq['options_meta']) for mcq in mcqs])
+    widths = np.zeros((len(mcqs), width), dtype=np.float32)
+    present = np.zeros((len(mcqs), width), dtype=bool)
+    for row, mcq in enumerate(mcqs):
+        for col, (label, (para, _)) in enumerate(mcq['options_meta'].items()):
+            if para:
+                widths[row, col] = _option_rendered_width(para, label, metrics)
+                present[row, col] = True
+    return widths, present
+
+def classify_option_layouts(lengths, present,
+                            short_limit=SHORT_OPTION_CHAR_LIMIT, medium_limit=MEDIUM_OPTION_CHAR_LIMIT):
+    """
+    Vectorized `get_option_length_class` over an `option_length_matrix`.
+    Only the comparisons run here, so limits can be re-tried on a whole corpus cheaply.
+    """
+    np = _numpy()
+    absent = ~present
+    has_options = present.any(axis=1)
+    oneline = has_options & (absent | (lengths <= short_limit)).all(axis=1)
+    twoline = has_options & (absent | (lengths <= medium_limit)).all(axis=1)
+    return np.where(oneline, "oneline", np.where(twoline, "twoline", "fourline")).tolist()
+
+def assign_option_layouts(mcqs):
+    """
+    Stores each MCQ's option layout under 'option_layout' for `format_mcq`.
+    Options are measured against the tab stops with Tiro Bangla's glyph
+    advances when available, otherwise by the character-count limits.
+    """
+    if not mcqs: return
+    metrics = load_font_metrics()
+    if metrics is not None:
+        layouts = classify_option_layouts(*option_width_matrix(mcqs, metrics),
+                                          short_limit=ONELINE_OPTION_WIDTH_PT,
+                                          medium_limit=TWOLINE_OPTION_WIDTH_PT)
+    else:
+        layouts = classify_option_layouts(*option_length_matrix(mcqs))
+    for mcq, layout in zip(mcqs, layouts):
+        mcq['option_layout'] = layout
+
 def get_para_full_text(para):
     """
     Extracts a complete text string from a paragraph, including from OMML.
     Used for reliable parsing.
     """
-    full_str = ""
-    # Use split_text_and_omml without stripping anything to get all content
-    parts = split_text_and_omml(para, strip_label_prefix=None)
-    for ctype, cvalue in parts:
-        if ctype == "text":
-            full_str += cvalue
-        elif ctype == "omml":
-            # Convert OMML to its plain text representation
-            full_str += omml_to_text(cvalue)
-    return full_str.strip()
+    record = para if isinstance(para, ParaRecord) else parse_paragraph(para)
+    return record.line
+
 
+# --- Line Classification ---
+# Compiled once at import. The answer pattern folds the old "with label" and
+# "without label" attempts into one scan via an optional label group.
+SERIAL_RE = re.compile(r'^\s*[\(]?([০-৯0-9]+)[\.\)\।]?\s*(.*)')
+OPTION_RE = re.compile(r'^\s*[\(\[]?\s*([কখগঘa-dA-D])[\.\)\]\।]?\s*(.*)')
+ANSWER_RE = re.compile(r'^উত্তর[:：ঃ]?\s*(?:[\(\[]?\s*([কখগঘa-dA-D])[\.\)\]\।]?\s*)?(.*)', re.IGNORECASE)
+EXPLANATION_RE = re.compile(r'^(ব্যাখ্যা[:：ঃ]?)\s*(.*)')
+
+def classify_line(line):
+    """
+    Classifies an MCQ line in a single scan.
+    Returns (kind, label, text) with kind "option", "answer", "explanation" or None.
+    The kinds are told apart by the first character (answers start with 'উ',
+    explanations with 'ব', which no option label matches), so at most one
+    pattern runs per line.
+    """
+    head = line[:1]
+    if head == 'উ':
+        m = ANSWER_RE.match(line)
+        if m:
+            return ("answer", m.group(1), m.group(2).lstrip(').।. ').strip())
+    elif head == 'ব':
+        m = EXPLANATION_RE.match(line)
+        if m:
+            return ("explanation", m.group(1), m.group(2))
+    else:
+        m = OPTION_RE.match(line)
+        if m:
+            return ("option", m.group(1), m.group(2).strip())
+    return (None, None, line)
 
 def parse_serial_and_question(line):
-    m = re.match(r'^\s*[\(]?([০-৯0-9]+)[\.\)\।]?\s*(.*)', line)
+    m = SERIAL_RE.match(line)
     return m.groups() if m else (None, line)
 
 def parse_option(line):
-    m = re.match(r'^\s*[\(\[]?\s*([কখগঘa-dA-D])[\.\)\]\।]?\s*(.*)', line)
+    m = OPTION_RE.match(line)
     return (m.group(1), m.group(2).strip()) if m else (None, line)
 
 def parse_answer(line):
-    m = re.match(r'^উত্তর[:：ঃ]?\s*[\(\[]?\s*([কখগঘa-dA-D])[\.\)\]\।]?\s*(.*)', line, re.IGNORECASE)
-    if m:
-        return (m.group(1), m.group(2).lstrip(').।. ').strip())
-    m2 = re.match(r'^উত্তর[:：ঃ]?\s*(.*)', line, re.IGNORECASE)
-    return (None, m2.group(1).lstrip(').।. ').strip()) if m2 else (None, None)
+    m = ANSWER_RE.match(line)
+    return (m.group(1), m.group(2).lstrip(').।. ').strip()) if m else (None, None)
 
 def parse_explanation(line):
-    m = re.match(r'^(ব্যাখ্যা[:：ঃ]?)\s*(.*)', line)
+    m = EXPLANATION_RE.match(line)
     return (m.group(1), m.group(2)) if m else (None, None)
 
 
@@ -247,8 +586,8 @@ def extract_mcqs(paragraphs):
             i += 1
         
         elif state == "in_question":
-            opt_label, _ = parse_option(line)
-            if opt_label:
+            kind, _, _ = classify_line(line)
+            if kind == "option":
                 state = "in_options"
                 continue
             
@@ -262,30 +601,28 @@ def extract_mcqs(paragraphs):
             i += 1
 
         elif state == "in_options":
-            opt_label, opt_text = parse_option(line)
-            ans_label, ans_text = parse_answer(line)
-            exp_label, exp_text = parse_explanation(line)
-
-            if opt_label:
-                cur['options_meta'][opt_label] = (para, opt_text)
-            elif ans_label is not None or ans_text is not None:
-                cur['answer_label'] = ans_label
+            kind, label, text = classify_line(line)
+
+            if kind == "option":
+                cur['options_meta'][label] = (para, text)
+            elif kind == "answer":
+                cur['answer_label'] = label
                 # Store the paragraph object and text for later comparison
-                cur['answer_meta'] = (para, ans_text)
-            elif exp_label:
-                cur['explanation_meta'] = (para, exp_label)
+                cur['answer_meta'] = (para, text)
+            elif kind == "explanation":
+                cur['explanation_meta'] = (para, label)
             
             cur['all_paras'].add(i)
             para_to_mcq[i] = len(mcqs)
             
             # Check for end of MCQ block
-            if ans_label is not None or ans_text is not None or exp_label is not None:
+            if kind in ("answer", "explanation"):
                 # Look ahead for an explanation on the next line if one wasn't on the same line
-                if not exp_label and (i + 1) < len(paragraphs):
+                if kind == "answer" and (i + 1) < len(paragraphs):
                     next_para = paragraphs[i+1]
-                    next_line_text = get_para_full_text(next_para)
-                    if parse_explanation(next_line_text)[0]:
-                        cur['explanation_meta'] = (next_para, parse_explanation(next_line_text)[0])
+                    next_kind, next_label, _ = classify_line(get_para_full_text(next_para))
+                    if next_kind == "explanation":
+                        cur['explanation_meta'] = (next_para, next_label)
                         cur['all_paras'].add(i + 1)
                 
                 mcqs.append(cur)
@@ -313,11 +650,41 @@ def get_full_content_string(para, label_to_strip):
     # Normalize by removing all whitespace and making it lowercase for robust comparison
     return re.sub(r'\s+', '', full_str).lower()
 
+class ParagraphWriter:
+    """
+    Appends paragraphs to a document and remembers the last one (`last`), so
+    formatters can space a finished block without rescanning `doc.paragraphs`.
+    New paragraphs go straight before the trailing sectPr; `doc.add_paragraph`
+    would search the whole body for it on every call.
+    The same class lives in the CQ converter (preparation_book_converter_CQ.py); keep the two in sync.
+    """
+
+    def __init__(self, doc):
+        self._parent = doc._body
+        self._body = doc.element.body
+        try:
+            tail = self._body[-1]
+        except IndexError:
+            tail = None
+        self._sect_pr = tail if tail is not None and tail.tag == qn('w:sectPr') else None
+        self.last = None
+
+    def add_paragraph(self):
+        p = OxmlElement('w:p')
+        if self._sect_pr is not None:
+            self._sect_pr.addprevious(p)
+        else:
+            self._body.append(p)
+        self.last = Paragraph(p, self._parent)
+        return self.last
+
+
 def format_mcq(mcq, doc, tab_stops_oneline, tab_stops_twoline):
-    """Formats and writes a single MCQ to the output document."""
-    
+    """Formats and writes a single MCQ to the output document; returns its last paragraph."""
+    out = ParagraphWriter(doc)
+
     # --- Question ---
-    q_para = doc.add_paragraph()
+    q_para = out.add_paragraph()
     set_bangla_font(q_para.add_run(f"{mcq['serial']}. "), bold=True)
     
     # --- Question and Metadata Processing ---
@@ -350,16 +717,16 @@ def format_mcq(mcq, doc, tab_stops_oneline, tab_stops_twoline):
 
     # Render roman numeral items if any exist
     for i, p in enumerate(roman_numeral_paras):
-        sub_p = doc.add_paragraph()
+        sub_p = out.add_paragraph()
         set_bangla_font(sub_p.add_run(f"{ROMAN_NUMERALS[i]} "), bold=True)
         render_parts_to_para(sub_p, split_text_and_omml(p))
 
     # Render the prompt line (e.g., "Which is correct?")
     if prompt_line_para:
-        render_parts_to_para(doc.add_paragraph(), split_text_and_omml(prompt_line_para))
+        render_parts_to_para(out.add_paragraph(), split_text_and_omml(prompt_line_para))
 
     # --- Options ---
-    option_layout = get_option_length_class(mcq['options_meta'])
+    option_layout = mcq.get('option_layout') or get_option_length_class(mcq['options_meta'])
     # Ensure a consistent order for options
     label_order = [lbl for lbl in OPTION_LABELS_BN if lbl in mcq['options_meta']] + \
                   [lbl for lbl in OPTION_LABELS_EN if lbl in mcq['options_meta']]
@@ -373,7 +740,7 @@ def format_mcq(mcq, doc, tab_stops_oneline, tab_stops_twoline):
         render_parts_to_para(p, parts)
         
     if option_layout == "oneline":
-        p = doc.add_paragraph()
+        p = out.add_paragraph()
         p.paragraph_format.tab_stops.clear_all()
         for tab in tab_stops_oneline: p.paragraph_format.tab_stops.add_tab_stop(tab)
         for i, label in enumerate(label_order[:4]):
@@ -382,7 +749,7 @@ def format_mcq(mcq, doc, tab_stops_oneline, tab_stops_twoline):
             
     elif option_layout == "twoline":
         for i, row in enumerate([(0, 1), (2, 3)]):
-            p = doc.add_paragraph()
+            p = out.add_paragraph()
             p.paragraph_format.tab_stops.clear_all()
             for tab in tab_stops_twoline: p.paragraph_format.tab_stops.add_tab_stop(tab)
             for j, opt_idx in enumerate(row):
@@ -392,7 +759,7 @@ def format_mcq(mcq, doc, tab_stops_oneline, tab_stops_twoline):
                 render_option(p, label, label_map_bn.get(label))
     else: # "fourline"
         for i, label in enumerate(label_order[:4]):
-             p = doc.add_paragraph()
+             p = out.add_paragraph()
              render_option(p, label, label_map_bn.get(label))
 
     # --- Answer Section (REVISED LOGIC) ---
@@ -400,7 +767,7 @@ def format_mcq(mcq, doc, tab_stops_oneline, tab_stops_twoline):
     ans_meta = mcq.get('answer_meta') # Tuple: (paragraph, raw_text)
 
     if ans_label or ans_meta:
-        p = doc.add_paragraph()
+        p = out.add_paragraph()
         set_bangla_font(p.add_run("উত্তর: "), bold=True, color=ANSWER_COLOR)
 
         # Case 1: The answer is given with an explicit label (e.g., "উত্তর: ক")
@@ -442,18 +809,18 @@ def format_mcq(mcq, doc, tab_stops_oneline, tab_stops_twoline):
     # --- Explanation Section ---
     if mcq.get('explanation_meta'):
         para, label = mcq['explanation_meta']
-        ep = doc.add_paragraph()
+        ep = out.add_paragraph()
         set_bangla_font(ep.add_run("ব্যাখ্যা: "), bold=True)
         parts = split_text_and_omml(para, strip_label_prefix="ব্যাখ্যা")
         render_parts_to_para(ep, parts)
 
     # Add space after the entire MCQ block
-    if doc.paragraphs:
-        doc.paragraphs[-1].paragraph_format.space_after = Pt(8)
+    out.last.paragraph_format.space_after = Pt(8)
+    return out.last
 
 
 def copy_para_with_omml(src_para, outdoc, bold=False):
-    out_p = outdoc.add_paragraph()
+    out_p = ParagraphWriter(outdoc).add_paragraph()
     render_parts_to_para(out_p, split_text_and_omml(src_para), bold=bold)
     return out_p
 
@@ -514,6 +881,7 @@ def _parse_omml_node_recursive(node):
     else:
         return "".join(_parse_omml_node_recursive(child) for child in node)
 
+@OMML_MEMO
 def omml_to_latex_text(omml_xml):
     """
     Converts OMML XML to a clean, human-readable plain text string for export.
@@ -572,6 +940,7 @@ def _parse_omml_to_latex_recursive(node):
     else:
         return "".join(_parse_omml_to_latex_recursive(child) for child in node)
 
+@OMML_MEMO
 def omml_to_latex(omml_xml):
     """Converts OMML to a pure LaTeX string for data export."""
     try:
@@ -597,12 +966,11 @@ def get_para_content_for_export(para):
             full_str += omml_to_latex(cvalue)
     return full_str.strip()
 
-def mcqs_to_rows(mcqs):
+def iter_mcq_rows(mcqs):
     """
-    Converts MCQ list to rows for export with correct Type, Reference, Answer Label,
+    Yields one export row per MCQ with correct Type, Reference, Answer Label,
     Answer Text, Explanation, and LaTeX, without modifying the extract_mcqs function.
     """
-    rows = []
     for mcq in mcqs:
         # --- 1. Process Question Block for Type and Reference ---
         all_question_paras = [p for p, _ in mcq['question_meta']]
@@ -690,32 +1058,133 @@ def mcqs_to_rows(mcqs):
             'Answer_Text': answer_text,
             'Explanation': explanation_text
         }
-        rows.append(row)
-    return rows
+        yield row
+
+def mcqs_to_rows(mcqs):
+    return list(iter_mcq_rows(mcqs))
+
+EXPORT_COLUMNS = ['Serial', 'Type', 'Reference', 'Question', 'Option_ক', 'Option_খ', 'Option_গ', 'Option_ঘ',
+                  'Answer_Label', 'Answer_Text', 'Explanation']
+
+
+class CsvSink:
+    """Streams rows to a UTF-8 (BOM) CSV that Excel opens with Bangla intact."""
+
+    def __init__(self, path):
+        self.file = open(path, "w", encoding="utf-8-sig", newline="")
+        self.writer = csv.DictWriter(self.file, fieldnames=EXPORT_COLUMNS, lineterminator=os.linesep)
+        self.writer.writeheader()
+
+    def write_row(self, row):
+        self.writer.writerow(row)
+
+    def close(self):
+        self.file.close()
+
+
+class XlsxSink:
+    """
+    Streams rows through openpyxl's write-only workbook, so memory stays
+    flat however many MCQs a book has.
+    """
+
+    def __init__(self, path):
+        from openpyxl import Workbook
+
+        self.path = path
+        self.workbook = Workbook(write_only=True)
+        self.sheet = self.workbook.create_sheet("Sheet1")
+        self.sheet.append(EXPORT_COLUMNS)
+
+    def write_row(self, row):
+        self.sheet.append([row[name] for name in EXPORT_COLUMNS])
+
+    def close(self):
+        self.workbook.save(self.path)
+
+
+class JsonSink:
+    """Streams rows as a JSON array, formatted exactly like json.dump(..., indent=2)."""
+
+    def __init__(self, path):
+        self.file = open(path, "w", encoding="utf-8")
+        self.count = 0
+
+    def write_row(self, row):
+        item = json.dumps(row, ensure_ascii=False, indent=2).replace("\n", "\n  ")
+        self.file.write(("[\n  " if self.count == 0 else ",\n  ") + item)
+        self.count += 1
+
+    def close(self):
+        self.file.write("\n]" if self.count else "[]")
+        self.file.close()
+
+
+# Export format -> (sink, file extension)
+EXPORTERS = {
+    'excel': (XlsxSink, ".xlsx"),
+    'csv': (CsvSink, ".csv"),
+    'json': (JsonSink, ".json"),
+}
+
+
+class ExportError(Exception):
+    """Some exports failed; `failures` maps each format to its (path, exception)."""
+
+    def __init__(self, failures):
+        self.failures = failures
+        super().__init__("; ".join(f"{fmt} export to {path} failed: {e}" for fmt, (path, e) in failures.items()))
+
+
+def export_mcqs(mcqs, paths, cancel=None):
+    """
+    Writes `mcqs` to every {format: path} in `paths` in a single pass: each
+    row (and its LaTeX conversion) is computed once and handed to all sinks.
+    A failing sink is dropped and the others finish; ExportError then names
+    every format that failed. Setting the `cancel` event stops between rows
+    with ConversionCancelled.
+    """
+    sinks, failures = {}, {}
+    for fmt, path in paths.items():
+        try:
+            sinks[fmt] = EXPORTERS[fmt][0](path)
+        except Exception as e:
+            failures[fmt] = (path, e)
+    try:
+        for row in iter_mcq_rows(mcqs):
+            if cancel is not None and cancel.is_set():
+                raise ConversionCancelled()
+            for fmt, sink in list(sinks.items()):
+                try:
+                    sink.write_row(row)
+                except Exception as e:
+                    failures[fmt] = (paths[fmt], e)
+                    del sinks[fmt]
+                    try:
+                        sink.close()
+                    except Exception:
+                        pass
+    finally:
+        for fmt, sink in sinks.items():
+            try:
+                sink.close()
+            except Exception as e:
+                failures[fmt] = (paths[fmt], e)
+    if failures:
+        raise ExportError(failures)
 
 def export_mcqs_to_csv(mcqs, csv_path="mcqs.csv"):
-    rows = mcqs_to_rows(mcqs)
-    df = pd.DataFrame(rows)
-    df.to_csv(csv_path, index=False, encoding='utf-8-sig')
+    export_mcqs(mcqs, {'csv': csv_path})
 
 def export_mcqs_to_excel(mcqs, excel_path="mcqs.xlsx"):
-    rows = mcqs_to_rows(mcqs)
-    df = pd.DataFrame(rows)
-    df.to_excel(excel_path, index=False)
+    export_mcqs(mcqs, {'excel': excel_path})
 
 def export_mcqs_to_json(mcqs, json_path="mcqs.json"):
-    rows = mcqs_to_rows(mcqs)
-    with open(json_path, "w", encoding="utf-8") as f:
-        json.dump(rows, f, ensure_ascii=False, indent=2)
+    export_mcqs(mcqs, {'json': json_path})
 
 
-def convert_file(src_file, out_file):
-    try:
-        doc = Document(src_file)
-    except Exception as e:
-        messagebox.showerror("File Error", f"Could not open source file.\n\n{e}")
-        return False
-        
+def new_output_document():
+    """Creates the empty two-column output document with the book's page setup."""
     outdoc = Document()
     section = outdoc.sections[0]
     section.page_width = Inches(8.5)
@@ -727,41 +1196,532 @@ def convert_file(src_file, out_file):
     cols = section._sectPr.xpath('./w:cols')[0]
     cols.set(qn('w:num'), '2')
     cols.set(qn('w:space'), '210')
+    return outdoc
 
-    tab_stops_oneline = [Inches(0.8), Inches(1.6), Inches(2.4)]
-    tab_stops_twoline = [Inches(1.6)]
 
-    mcqs, para_to_mcq = extract_mcqs(doc.paragraphs)
-    export_mcqs_to_csv(mcqs, "your_mcqs.csv")
-    export_mcqs_to_excel(mcqs, "your_mcqs.xlsx")
-    export_mcqs_to_json(mcqs, "your_mcqs.json")
-    processed_mcq_indices = set()
-    
-    i = 0
-    while i < len(doc.paragraphs):
-        if i in para_to_mcq:
-            mcq_idx = para_to_mcq[i]
-            if mcq_idx not in processed_mcq_indices:
-                format_mcq(mcqs[mcq_idx], outdoc, tab_stops_oneline, tab_stops_twoline)
-                processed_mcq_indices.add(mcq_idx)
-            i = max(mcqs[mcq_idx]['all_paras']) + 1
+class StreamingDocxWriter:
+    """
+    Streams finished paragraphs straight into word/document.xml of the output
+    zip, so memory stays flat however many MCQs a book has.
+
+    Formatters write into `self.doc`, a scratch Document carrying the page
+    setup; `flush()` serializes its body to the zip and empties it. The rest
+    of the package (styles, settings, ...) is copied from that scratch
+    document, so the result matches `Document.save` byte for byte. If
+    formatting fails midway, the file is still closed as a valid DOCX holding
+    every block flushed so far.
+    """
+
+    def __init__(self, out_file, doc):
+        self.doc = doc
+        self._body = doc.element.body
+        # Everything except document.xml comes from the empty scratch package
+        template = BytesIO()
+        doc.save(template)
+        doc_xml = self._serialize()
+        body_start = doc_xml.index(b'<w:body>') + len(b'<w:body>')
+        self._tail = doc_xml[doc_xml.rindex(b'<w:sectPr'):]
+
+        self._zip = zipfile.ZipFile(out_file, 'w', zipfile.ZIP_DEFLATED)
+        with zipfile.ZipFile(template) as src:
+            for item in src.infolist():
+                if item.filename != 'word/document.xml':
+                    self._zip.writestr(item, src.read(item))
+        self._stream = self._zip.open('word/document.xml', 'w', force_zip64=True)
+        self._stream.write(doc_xml[:body_start])
+
+    def _serialize(self):
+        # Serializing from the root keeps namespace declarations on
+        # <w:document> only, instead of repeating them on every paragraph.
+        return etree.tostring(self.doc.element, encoding='UTF-8', standalone=True)
+
+    def flush(self):
+        """Moves every paragraph written so far from the scratch body to disk; returns the bytes written."""
+        blocks = [el for el in self._body if el.tag != qn('w:sectPr')]
+        if not blocks:
+            return b''
+        doc_xml = self._serialize()
+        start = doc_xml.index(b'<w:body>') + len(b'<w:body>')
+        fragment = doc_xml[start:doc_xml.rindex(b'<w:sectPr')]
+        self._stream.write(fragment)
+        for el in blocks:
+            self._body.remove(el)
+        return fragment
+
+    def write_raw(self, fragment):
+        """Appends an already serialized body fragment (e.g. from a FragmentCache)."""
+        self.flush()
+        self._stream.write(fragment)
+
+    def close(self):
+        self.flush()
+        self._stream.write(self._tail)
+        self._stream.close()
+        self._zip.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+
+FRAGMENT_CACHE_MAX_BYTES = 256 * 1024 * 1024
+FRAGMENT_CACHE_PRUNE_TO = 0.8  # pruning frees space down to this share of the cap
+
+
+class FragmentCache:
+    """
+    On-disk cache of rendered MCQ blocks, one file per block, keyed by a hash
+    of the block's source paragraph XML, its option layout, this script's own
+    code and the python-docx/lxml versions, so any change to those
+    re-renders the block. Alongside, each sheet's parsed paragraphs are kept
+    by their XML, so a re-run only parses the paragraphs that were edited.
+    Files are written atomically, so batch workers can share one cache folder.
+    Past `max_bytes` the least recently used blocks are deleted on write.
+    """
+
+    def __init__(self, cache_dir, max_bytes=FRAGMENT_CACHE_MAX_BYTES):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        os.makedirs(cache_dir, exist_ok=True)
+        self.hits = self.misses = 0
+        self._size = sum(size for _, size, _ in self._entries())
+
+    def _entries(self):
+        """(path, size, last use) of every cached block."""
+        entries = []
+        with os.scandir(self.cache_dir) as it:
+            for entry in it:
+                if entry.name.endswith((".xml", ".json")):
+                    try:
+                        st = entry.stat()
+                    except OSError:  # removed by another worker meanwhile
+                        continue
+                    entries.append((entry.path, st.st_size, st.st_mtime))
+        return entries
+
+    def key(self, mcq, para_keys):
+        """Cache key of an MCQ block; `para_keys` are from `paragraph_records`."""
+        digest = hashlib.sha256(_code_fingerprint())
+        digest.update(_library_versions())
+        # The layout also depends on whether the font metrics could be loaded
+        digest.update(mcq.get('option_layout', '').encode())
+        for i in sorted(mcq['all_paras']):
+            digest.update(para_keys[i])
+        return digest.hexdigest()
+
+    def paragraph_records(self, src_file, paragraphs):
+        """
+        (ParaRecords, XML digests) of `paragraphs`, like `build_paragraph_ir`.
+        Records saved by the last run on `src_file` are reused for paragraphs
+        whose XML is unchanged; only the others are parsed.
+        """
+        digest = hashlib.sha256(_code_fingerprint())
+        digest.update(_library_versions())
+        digest.update(os.path.abspath(src_file).encode('utf-8'))
+        path = os.path.join(self.cache_dir, digest.hexdigest() + ".json")
+        try:
+            with open(path, encoding="utf-8") as f:
+                saved = json.load(f)
+        except (OSError, ValueError):
+            saved = {}
+
+        records, para_keys, current = [], [], {}
+        for para in paragraphs:
+            para_key = hashlib.sha1(etree.tostring(para._element)).digest()
+            hex_key = para_key.hex()
+            stored = saved.get(hex_key)
+            record = _record_from_json(stored) if stored else parse_paragraph(para)
+            current[hex_key] = stored or _record_to_json(record)
+            records.append(record)
+            para_keys.append(para_key)
+        if current != saved:
+            data = json.dumps(current, ensure_ascii=False).encode("utf-8")
+            self._write(path, data)
+        return records, para_keys
+
+    def _write(self, path, data):
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+        self._size += len(data)
+        if self._size > self.max_bytes:
+            self.prune()
+
+    def get(self, key):
+        path = os.path.join(self.cache_dir, key + ".xml")
+        try:
+            with open(path, "rb") as f:
+                fragment = f.read()
+            os.utime(path)  # mark as recently used for pruning
+        except OSError:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return fragment
+
+    def put(self, key, fragment):
+        self._write(os.path.join(self.cache_dir, key + ".xml"), fragment)
+
+    def prune(self):
+        """Deletes the least recently used blocks until the cache is back under its cap."""
+        entries = sorted(self._entries(), key=lambda entry: entry[2])
+        self._size = sum(size for _, size, _ in entries)
+        target = self.max_bytes * FRAGMENT_CACHE_PRUNE_TO
+        for path, size, _ in entries:
+            if self._size <= target:
+                break
+            try:
+                os.remove(path)
+            except OSError:  # already pruned by another worker
+                pass
+            self._size -= size
+
+
+def _record_to_json(record):
+    text, full_text, line, parts, offsets = record
+    return [text, full_text, line, [[ctype, str(cvalue)] for ctype, cvalue in parts], list(offsets)]
+
+
+def _record_from_json(data):
+    """A ParaRecord saved by `_record_to_json`; its equations get their run template on first use."""
+    text, full_text, line, parts, offsets = data
+    parts = tuple((ctype, OmmlXml(cvalue) if ctype == "omml" else cvalue) for ctype, cvalue in parts)
+    return ParaRecord(text, full_text, line, parts, tuple(offsets))
+
+
+@lru_cache(maxsize=1)
+def _code_fingerprint():
+    """Digest of this script, so cached blocks never outlive a formatting change."""
+    try:
+        with open(os.path.abspath(__file__), "rb") as f:
+            return hashlib.sha256(f.read()).digest()
+    except (OSError, NameError):  # e.g. frozen builds without the source
+        return b''
+
+
+@lru_cache(maxsize=1)
+def _library_versions():
+    """The libraries that serialize cached blocks; an upgrade must not reuse old fragments."""
+    import docx
+    return f"python-docx {docx.__version__}; lxml {etree.LXML_VERSION}; libxml2 {etree.LIBXML_VERSION}".encode()
+
+
+class ConversionCancelled(Exception):
+    """Raised inside a conversion when the user presses Cancel."""
+
+
+class MCQPipeline:
+    """
+    Loads a source sheet and extracts its MCQs exactly once, then feeds the
+    DOCX writer and any selected exporters from the same MCQ list.
+    """
+
+    def __init__(self, src_file, doc=None, cache=None):
+        self.src_file = src_file
+        self.cache = cache
+        doc = doc if doc is not None else Document(src_file)
+        if cache is None:
+            self.paragraphs, self.para_keys = build_paragraph_ir(doc), None
         else:
-            para = doc.paragraphs[i]
-            # Process non-MCQ paragraphs (headings, etc.)
-            if get_para_full_text(para):
-                copy_para_with_omml(para, outdoc, bold=is_extra_heading(para.text))
-            i += 1
-            
+            self.paragraphs, self.para_keys = cache.paragraph_records(src_file, snapshot_paragraphs(doc))
+        self.mcqs, self.para_to_mcq = extract_mcqs(self.paragraphs)
+        assign_option_layouts(self.mcqs)
+
+    def iter_blocks(self):
+        """Yields ("mcq", mcq) and ("para", record) output blocks in source order."""
+        paragraphs, mcqs, para_to_mcq = self.paragraphs, self.mcqs, self.para_to_mcq
+        processed_mcq_indices = set()
+
+        i = 0
+        while i < len(paragraphs):
+            if i in para_to_mcq:
+                mcq_idx = para_to_mcq[i]
+                if mcq_idx not in processed_mcq_indices:
+                    yield "mcq", mcqs[mcq_idx]
+                    processed_mcq_indices.add(mcq_idx)
+                i = max(mcqs[mcq_idx]['all_paras']) + 1
+            else:
+                para = paragraphs[i]
+                # Process non-MCQ paragraphs (headings, etc.)
+                if get_para_full_text(para):
+                    yield "para", para
+                i += 1
+
+    def write_block(self, outdoc, kind, item):
+        if kind == "mcq":
+            format_mcq(item, outdoc, TAB_STOPS_ONELINE, TAB_STOPS_TWOLINE)
+        else:
+            copy_para_with_omml(item, outdoc, bold=is_extra_heading(item.text))
+
+    def build_docx(self, progress=None, cancel=None):
+        """
+        Builds the reformatted two-column output document in memory.
+        `progress(done, total)` is called after each MCQ; setting the
+        `cancel` event stops the build with ConversionCancelled.
+        """
+        outdoc = new_output_document()
+        total = len(self.mcqs)
+        done = 0
+        for kind, item in self.iter_blocks():
+            if cancel is not None and cancel.is_set():
+                raise ConversionCancelled()
+            self.write_block(outdoc, kind, item)
+            if kind == "mcq":
+                done += 1
+                if progress is not None:
+                    progress(done, total)
+        return outdoc
+
+    def stream_docx(self, out_file):
+        """
+        Writes the output document to `out_file` in bounded memory.
+        With a FragmentCache, MCQs whose source paragraphs are unchanged since
+        an earlier run are spliced in from the cache instead of re-formatted.
+        """
+        cache = self.cache
+        with StreamingDocxWriter(out_file, new_output_document()) as writer:
+            for kind, item in self.iter_blocks():
+                key = cache.key(item, self.para_keys) if cache and kind == "mcq" else None
+                fragment = cache.get(key) if key else None
+                if fragment is not None:
+                    writer.write_raw(fragment)
+                    continue
+                self.write_block(writer.doc, kind, item)
+                fragment = writer.flush()
+                if key:
+                    cache.put(key, fragment)
+
+    def export_paths(self, basepath, formats):
+        """{format: path} of the files `export` writes."""
+        return {fmt: basepath + EXPORTERS[fmt][1] for fmt in formats}
+
+    def export(self, basepath, formats, cancel=None):
+        """Writes the extracted MCQs as `basepath` + extension for each format."""
+        if formats:
+            export_mcqs(self.mcqs, self.export_paths(basepath, formats), cancel)
+
+
+def convert_file(src_file, out_file, export_formats=()):
+    try:
+        doc = Document(src_file)
+    except Exception as e:
+        messagebox.showerror("File Error", f"Could not open source file.\n\n{e}")
+        return False
+    try:
+        pipeline = MCQPipeline(src_file, doc)
+    except Exception as e:
+        messagebox.showerror("Extraction Error", f"Could not read the MCQs from the source file.\n\n{type(e).__name__}: {e}")
+        return False
+
+    outdoc = pipeline.build_docx()
     try:
         outdoc.save(out_file)
     except Exception as e:
         messagebox.showerror("Save Error", f"Could not save output file.\n\n{e}")
         return False
 
+    # Use output filename as base for the exported data files
+    try:
+        pipeline.export(out_file.rsplit('.', 1)[0], export_formats)
+    except ExportError as e:
+        messagebox.showerror("Export Error", f"The DOCX was saved, but some exports failed.\n\n{e}")
+        return False
     return True
 
 
-# --- Tkinter GUI (Unchanged) ---
+def convert_file_worker(src_file, out_file, export_formats, events, cancel):
+    """
+    `convert_file` for a background thread: Tk must only be touched from the
+    main loop, so results go onto the `events` queue instead of messageboxes.
+    Posts ("progress", done, total), ("status", text), then exactly one of
+    ("done", basepath), ("cancelled",) or ("error", title, message).
+    A cancelled conversion leaves no output behind: the event is checked
+    before the save and the exports, and files already written are removed.
+    """
+    written = []
+    try:
+        events.put(("status", "Reading source file..."))
+        try:
+            doc = Document(src_file)
+        except Exception as e:
+            events.put(("error", "File Error", f"Could not open source file.\n\n{e}"))
+            return
+        try:
+            pipeline = MCQPipeline(src_file, doc)
+        except Exception as e:
+            events.put(("error", "Extraction Error",
+                        f"Could not read the MCQs from the source file.\n\n{type(e).__name__}: {e}"))
+            return
+
+        outdoc = pipeline.build_docx(
+            progress=lambda done, total: events.put(("progress", done, total)),
+            cancel=cancel)
+        if cancel.is_set():
+            raise ConversionCancelled()
+        events.put(("status", "Saving..."))
+        try:
+            outdoc.save(out_file)
+        except Exception as e:
+            events.put(("error", "Save Error", f"Could not save output file.\n\n{e}"))
+            return
+        written.append(out_file)
+
+        basepath = out_file.rsplit('.', 1)[0]
+        if cancel.is_set():
+            raise ConversionCancelled()
+        events.put(("status", "Exporting..."))
+        # From here on every export file is (re)created by this run
+        written.extend(pipeline.export_paths(basepath, export_formats).values())
+        try:
+            pipeline.export(basepath, export_formats, cancel)
+        except ExportError as e:
+            events.put(("error", "Export Error", f"The DOCX was saved, but some exports failed.\n\n{e}"))
+            return
+        events.put(("done", basepath))
+    except ConversionCancelled:
+        remove_files(written)
+        events.put(("cancelled",))
+    except Exception as e:
+        events.put(("error", "Conversion Error", f"Conversion failed.\n\n{e}"))
+
+
+def remove_files(paths):
+    """Deletes the outputs of a cancelled conversion, ignoring any that were never written."""
+    for path in paths:
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+
+# --- Headless Batch Mode ---
+
+BATCH_SUMMARY_FIELDS = ['file', 'output', 'status', 'mcqs', 'seconds', 'omml_hits', 'omml_misses', 'error']
+
+def convert_one(src_file, out_file, export_formats=(), stream=False, cache_dir=None):
+    """
+    Converts one sheet without any dialogs. Raises on failure; returns (mcq count, seconds).
+    A `cache_dir` enables incremental re-conversion (and implies streaming output).
+    """
+    start = time.perf_counter()
+    pipeline = MCQPipeline(src_file, cache=FragmentCache(cache_dir) if cache_dir else None)
+    if stream or cache_dir:
+        pipeline.stream_docx(out_file)
+    else:
+        pipeline.build_docx().save(out_file)
+    pipeline.export(out_file.rsplit('.', 1)[0], export_formats)
+    return len(pipeline.mcqs), time.perf_counter() - start
+
+def _batch_worker(job):
+    """Process-pool entry point; a failing sheet is reported, never raised."""
+    src_file, out_file, export_formats, stream, cache_dir = job
+    row = {'file': src_file, 'output': out_file, 'status': 'ok', 'mcqs': 0, 'seconds': 0, 'error': ''}
+    hits, misses = OMML_MEMO.totals()
+    try:
+        row['mcqs'], seconds = convert_one(src_file, out_file, export_formats, stream, cache_dir)
+        row['seconds'] = round(seconds, 2)
+    except Exception as e:
+        row['status'] = 'failed'
+        row['error'] = f"{type(e).__name__}: {e}"
+    # Equation reuse on this sheet (the memo itself lives on across sheets in a worker)
+    row['omml_hits'], row['omml_misses'] = (now - before for now, before in zip(OMML_MEMO.totals(), (hits, misses)))
+    return row
+
+def collect_sources(inputs):
+    """Expands files, folders and glob patterns into a sorted list of DOCX sheets."""
+    sources = []
+    for item in inputs:
+        if os.path.isdir(item):
+            matches = glob.glob(os.path.join(item, "*.docx"))
+        else:
+            matches = glob.glob(item)
+        # Skip Word's "~$name.docx" lock files
+        sources.extend(m for m in matches if m.lower().endswith(".docx") and not os.path.basename(m).startswith("~$"))
+    return sorted(set(sources))
+
+def output_paths(sources, out_dir):
+    """
+    (source, output) pairs for `sources`, each output named
+    <stem>_Reformatted.docx. Sources in different folders keep those
+    folders, relative to their common parent, under `out_dir`, so sheets
+    with the same name never overwrite each other.
+    """
+    sources = list(dict.fromkeys(os.path.realpath(src) for src in sources))
+    folders = [os.path.dirname(src) for src in sources]
+    try:
+        root = os.path.commonpath(folders) if folders else ""
+    except ValueError:  # different drives: mirror each full path
+        root = None
+    pairs = []
+    for src, folder in zip(sources, folders):
+        if root is None:
+            drive, rest = os.path.splitdrive(folder)
+            relative = os.path.join(drive.strip(":\\/"), rest.lstrip("\\/"))
+        else:
+            relative = os.path.relpath(folder, root)
+        stem = os.path.splitext(os.path.basename(src))[0]
+        pairs.append((src, os.path.normpath(os.path.join(out_dir, relative, stem + "_Reformatted.docx"))))
+    return pairs
+
+def run_batch(sources, out_dir, export_formats=(), workers=None, summary_path=None, stream=False, cache_dir=None):
+    """Converts many sheets across a process pool and writes a per-file CSV summary."""
+    from concurrent.futures import ProcessPoolExecutor
+
+    os.makedirs(out_dir, exist_ok=True)
+    jobs = []
+    for src_file, out_file in output_paths(sources, out_dir):
+        os.makedirs(os.path.dirname(out_file), exist_ok=True)
+        jobs.append((src_file, out_file, tuple(export_formats), stream, cache_dir))
+
+    results = []
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        for row in pool.map(_batch_worker, jobs):
+            mark = "✓" if row['status'] == 'ok' else "✗"
+            detail = f"{row['mcqs']} MCQs, {row['seconds']}s" if row['status'] == 'ok' else row['error']
+            print(f"{mark} {os.path.relpath(row['output'], out_dir)}: {detail}")
+            results.append(row)
+
+    summary_path = summary_path or os.path.join(out_dir, "conversion_summary.csv")
+    with open(summary_path, "w", newline="", encoding="utf-8-sig") as f:
+        writer = csv.DictWriter(f, fieldnames=BATCH_SUMMARY_FIELDS)
+        writer.writeheader()
+        writer.writerows(results)
+    return results
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Reformat MCQ sheets (.docx). Run without inputs to open the GUI.")
+    parser.add_argument('inputs', nargs='*', help="DOCX files, folders or glob patterns")
+    parser.add_argument('-o', '--out-dir', default="Reformatted", help="Folder for the reformatted sheets")
+    parser.add_argument('-j', '--workers', type=int, default=os.cpu_count(), help="Worker processes (default: all cores)")
+    parser.add_argument('--export', nargs='+', choices=list(EXPORTERS), default=[], help="Also export the MCQs as these formats")
+    parser.add_argument('--stream', action='store_true', help="Stream the output DOCX to disk (bounded memory for very large books)")
+    parser.add_argument('--cache', metavar="DIR", help="Reuse unchanged MCQ blocks rendered by earlier runs (implies --stream; kept under 256 MB)")
+    parser.add_argument('--summary', help="Status summary CSV (default: <out-dir>/conversion_summary.csv)")
+    args = parser.parse_args(argv)
+
+    if not args.inputs:
+        main_gui()
+        return 0
+
+    sources = collect_sources(args.inputs)
+    if not sources:
+        print("No DOCX files found.")
+        return 1
+
+    start = time.perf_counter()
+    results = run_batch(sources, args.out_dir, args.export, args.workers, args.summary, args.stream, args.cache)
+    failed = sum(1 for row in results if row['status'] != 'ok')
+    print(f"Converted {len(results) - failed}/{len(results)} sheets in {time.perf_counter() - start:.1f}s")
+    return 1 if failed else 0
+
+
+# --- Tkinter GUI ---
+POLL_INTERVAL_MS = 100  # how often the window drains the worker's event queue
+
+
 def main_gui():
     def select_input():
         filename = filedialog.askopenfilename(title="Select DOCX file", filetypes=[("Word Files", "*.docx")])
@@ -782,35 +1742,66 @@ def main_gui():
             messagebox.showwarning("Input Needed", "Please select both input and output files!")
             return
 
-        export_excel = var_excel.get()
-        export_csv = var_csv.get()
-        export_json = var_json.get()
+        export_formats = [fmt for fmt, var in (('excel', var_excel), ('csv', var_csv), ('json', var_json)) if var.get()]
 
-        if not (export_excel or export_csv or export_json):
+        if not export_formats:
             messagebox.showwarning("Export Needed", "Please select at least one export format (Excel, CSV, or JSON)!")
             return
         
-        root.config(cursor="wait")
-        root.update()
+        events = queue.Queue()
+        cancel = threading.Event()
+        job.update(events=events, cancel=cancel)
+        convert_button.config(state=tk.DISABLED)
+        cancel_button.config(state=tk.NORMAL)
+        progress_bar.config(value=0, maximum=1)
+        status_var.set("Starting...")
+        # One load + extraction feeds both the DOCX and the exports
+        threading.Thread(
+            target=convert_file_worker,
+            args=(src_file, out_file, export_formats, events, cancel),
+            daemon=True,
+        ).start()
+        root.after(POLL_INTERVAL_MS, poll_events)
+
+    def cancel_conversion():
+        if job.get("cancel") is not None:
+            job["cancel"].set()
+            cancel_button.config(state=tk.DISABLED)
+            status_var.set("Cancelling...")
+
+    def poll_events():
+        events = job["events"]
         try:
-            # DOCX convert as before
-            ok = convert_file(src_file, out_file)
-            # Now extract MCQs and export
-            doc = Document(src_file)
-            mcqs, para_to_mcq = extract_mcqs(doc.paragraphs)
-            basepath = out_file.rsplit('.', 1)[0]  # Use output filename as base for other files
-
-            if export_excel:
-                export_mcqs_to_excel(mcqs, basepath + ".xlsx")
-            if export_csv:
-                export_mcqs_to_csv(mcqs, basepath + ".csv")
-            if export_json:
-                export_mcqs_to_json(mcqs, basepath + ".json")
-        finally:
-            root.config(cursor="")
-        
-        if ok:
-            messagebox.showinfo("Done!", f"Successfully converted and exported to selected formats!\nSaved as base: {basepath}")
+            while True:
+                event = events.get_nowait()
+                if event[0] == "progress":
+                    done, total = event[1], event[2]
+                    progress_bar.config(value=done, maximum=max(total, 1))
+                    status_var.set(f"Formatting MCQ {done} of {total}")
+                elif event[0] == "status":
+                    status_var.set(event[1])
+                else:
+                    finish_conversion(event)
+                    return
+        except queue.Empty:
+            pass
+        root.after(POLL_INTERVAL_MS, poll_events)
+
+    def finish_conversion(event):
+        job.clear()
+        convert_button.config(state=tk.NORMAL)
+        cancel_button.config(state=tk.DISABLED)
+        if event[0] == "done":
+            status_var.set("Done.")
+            messagebox.showinfo("Done!", f"Successfully converted and exported to selected formats!\nSaved as base: {event[1]}")
+        elif event[0] == "cancelled":
+            progress_bar.config(value=0)
+            status_var.set("Cancelled.")
+        else:
+            status_var.set("Failed.")
+            messagebox.showerror(event[1], event[2])
+
+    job = {}
 
     root = tk.Tk()
     root.title("MCQ Sheet Formatter (.docx)")
@@ -834,9 +1825,17 @@ def main_gui():
     tk.Checkbutton(root, text="CSV (.csv)", variable=var_csv).grid(row=2, column=1, padx=110, sticky="w")
     tk.Checkbutton(root, text="JSON (.json)", variable=var_json).grid(row=2, column=1, padx=210, sticky="w")
 
-    tk.Button(root, text="Convert File", command=run_conversion, bg="#13825c", fg="white", width=16, height=2).grid(row=3, column=1, pady=20)
+    convert_button = tk.Button(root, text="Convert File", command=run_conversion, bg="#13825c", fg="white", width=16, height=2)
+    convert_button.grid(row=3, column=1, pady=(20, 5))
+    cancel_button = tk.Button(root, text="Cancel", command=cancel_conversion, state=tk.DISABLED, width=10)
+    cancel_button.grid(row=3, column=2, pady=(20, 5))
+
+    progress_bar = ttk.Progressbar(root, orient="horizontal", mode="determinate", length=400)
+    progress_bar.grid(row=4, column=1, padx=5, pady=5)
+    status_var = tk.StringVar(value="Ready.")
+    tk.Label(root, textvariable=status_var).grid(row=5, column=1, pady=(0, 10))
 
     root.mainloop()
 
 if __name__ == "__main__":
-    main_gui()
\ No newline at end of file
+    sys.exit(main())
\ No newline at end of file
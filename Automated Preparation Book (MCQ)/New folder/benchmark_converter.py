@@ -0,0 +1,342 @@
+"""
+Micro-benchmarks for the MCQ preparation book converter.
+
+Run from this folder:
+    python benchmark_converter.py walk
+    python benchmark_converter.py walk --sizes 500 5000 50000
+    python benchmark_converter.py classify
+    python benchmark_converter.py omml
+    python benchmark_converter.py layout --sheet "<chapter>.docx"
+    python benchmark_converter.py output --questions 500 5000
+    python benchmark_converter.py startup
+"""
+import argparse
+import importlib.util
+import os
+import re
+import subprocess
+import sys
+import tempfile
+import time
+from copy import deepcopy
+
+from docx import Document
+from docx.oxml import parse_xml
+from docx.oxml.ns import qn
+from lxml import etree
+
+CONVERTER_PATH = os.path.join(
+    os.path.dirname(os.path.abspath(__file__)),
+    "Preparation_book_converter v6.6.4 with OMML tkinter v2.2.5.1.py",
+)
+
+CQ_CONVERTER_PATH = os.path.join(
+    os.path.dirname(os.path.abspath(__file__)),
+    "..", "..", "Automated Preparation Book (CQ)", "preparation_book_converter_CQ.py",
+)
+
+# Interpreter start until the GUI's first frame is drawn
+TIME_TO_WINDOW_TARGET_S = 0.35
+
+# A real chapter sheet shipped in this folder
+DEFAULT_SHEET = os.path.join(
+    os.path.dirname(os.path.abspath(__file__)),
+    "Chapter 09 - H Math - SSC - সূচকীয় ও লগারিদমীয় ফাংশন MCQ.docx",
+)
+
+# One synthetic MCQ block, shaped like our chapter sheets
+SAMPLE_MCQ_LINES = [
+    "{n}. নিচের কোনটি মৌলিক সংখ্যা? [ঢাকা বোর্ড ২০২৩]",
+    "ক. ৪",
+    "খ. ৬",
+    "গ. ৭",
+    "ঘ. ৯",
+    "উত্তর: গ. ৭",
+    "ব্যাখ্যা: ৭ কেবল ১ এবং নিজেকে দিয়ে বিভাজ্য।",
+]
+
+
+def load_converter():
+    """Imports the converter script, whose file name is not a valid module name."""
+    spec = importlib.util.spec_from_file_location("mcq_converter", CONVERTER_PATH)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def build_sample_document(n_paragraphs):
+    """Builds an in-memory DOCX with roughly `n_paragraphs` MCQ paragraphs."""
+    doc = Document()
+    for line in SAMPLE_MCQ_LINES:
+        doc.add_paragraph(line.format(n=1))
+    # `doc.add_paragraph` scans the body for sectPr on every call, so clone
+    # the first block straight into place instead, renumbering each clone's
+    # serial so the sheet reads 1, 2, 3, ... like a real one.
+    body = doc.element.body
+    template = [p for p in body if p.tag == qn('w:p')]
+    serial_text = SAMPLE_MCQ_LINES[0].format(n="{n}")
+    sect_pr = body[-1]
+    for n in range(2, n_paragraphs // len(template) + 1):
+        for i, p in enumerate(template):
+            clone = deepcopy(p)
+            if i == 0:
+                clone.find('.//' + qn('w:t')).text = serial_text.format(n=n)
+            sect_pr.addprevious(clone)
+    return doc
+
+
+def _time(func, *args):
+    start = time.perf_counter()
+    result = func(*args)
+    return time.perf_counter() - start, result
+
+
+def walk_reindexed(doc, limit=None):
+    """The old `convert_file` walk: re-materializes `doc.paragraphs` on every step."""
+    i = 0
+    while i < len(doc.paragraphs) and (limit is None or i < limit):
+        doc.paragraphs[i].text
+        i += 1
+    return i
+
+
+def walk_snapshot(conv, doc):
+    """The current walk: one snapshot, then plain list indexing."""
+    paragraphs = conv.snapshot_paragraphs(doc)
+    i = 0
+    while i < len(paragraphs):
+        paragraphs[i].text
+        i += 1
+    return i
+
+
+def bench_walk(sizes, sample_limit=200):
+    conv = load_converter()
+    print(f"{'paragraphs':>10} {'re-indexed (s)':>16} {'snapshot (s)':>14} {'speedup':>9}")
+    for size in sizes:
+        doc = build_sample_document(size)
+        total = len(doc.paragraphs)
+        # The quadratic walk is too slow to finish at 50k; time a prefix and
+        # extrapolate linearly (each step costs a full O(n) rebuild).
+        steps = min(total, sample_limit)
+        old_time, _ = _time(walk_reindexed, doc, steps)
+        old_time *= total / steps
+        new_time, _ = _time(walk_snapshot, conv, doc)
+        marker = "~" if steps < total else " "
+        print(f"{total:>10} {marker}{old_time:>15.3f} {new_time:>14.4f} {old_time / new_time:>8.0f}x")
+
+
+def _legacy_classify(line):
+    """The old in_options step: three separate `re.match` calls per line."""
+    opt = re.match(r'^\s*[\(\[]?\s*([কখগঘa-dA-D])[\.\)\]\।]?\s*(.*)', line)
+    ans = re.match(r'^উত্তর[:：ঃ]?\s*[\(\[]?\s*([কখগঘa-dA-D])[\.\)\]\।]?\s*(.*)', line, re.IGNORECASE)
+    if not ans:
+        ans = re.match(r'^উত্তর[:：ঃ]?\s*(.*)', line, re.IGNORECASE)
+    exp = re.match(r'^(ব্যাখ্যা[:：ঃ]?)\s*(.*)', line)
+    return opt, ans, exp
+
+
+def bench_classify(sheet, repeat):
+    conv = load_converter()
+    lines = [record.line for record in conv.build_paragraph_ir(Document(sheet))]
+    lines = [line for line in lines if line]
+    legacy_time, _ = _time(lambda: [_legacy_classify(line) for _ in range(repeat) for line in lines])
+    new_time, _ = _time(lambda: [conv.classify_line(line) for _ in range(repeat) for line in lines])
+    n = len(lines) * repeat
+    print(f"{os.path.basename(sheet)}: {len(lines)} lines x {repeat}")
+    print(f"  3x re.match     {legacy_time:8.3f}s  ({legacy_time / n * 1e6:.2f} us/line)")
+    print(f"  classify_line   {new_time:8.3f}s  ({new_time / n * 1e6:.2f} us/line)")
+    print(f"  speedup         {legacy_time / new_time:8.1f}x")
+
+
+def _legacy_omml_run(conv, omml_xml):
+    """The old write path: patch (parse + serialize), wrap, then parse_xml again."""
+    size_val = str(int(conv.FONT_SIZE * 2))
+    tree = etree.fromstring(omml_xml)
+    ns = {'w': 'http://schemas.openxmlformats.org/wordprocessingml/2006/main'}
+    for sz_tag in tree.xpath('.//w:sz|.//w:szCs', namespaces=ns):
+        sz_tag.attrib[qn('w:val')] = size_val
+    patched = etree.tostring(tree, encoding='unicode')
+    return parse_xml(
+        '<w:r xmlns:w="http://schemas.openxmlformats.org/wordprocessingml/2006/main" '
+        'xmlns:m="http://schemas.openxmlformats.org/officeDocument/2006/math">' + patched + '</w:r>'
+    )
+
+
+def bench_omml(sheet, repeat):
+    conv = load_converter()
+    records = conv.build_paragraph_ir(Document(sheet))
+    equations = [cvalue for record in records for ctype, cvalue in record.parts if ctype == "omml"]
+    if not equations:
+        print(f"{os.path.basename(sheet)} has no equations.")
+        return
+    legacy_time, _ = _time(lambda: [_legacy_omml_run(conv, xml) for _ in range(repeat) for xml in equations])
+    new_time, _ = _time(lambda: [deepcopy(xml.run) for _ in range(repeat) for xml in equations])
+    n = len(equations) * repeat
+    print(f"{os.path.basename(sheet)}: {len(equations)} equations x {repeat}")
+    print(f"  patch + parse_xml  {legacy_time:8.3f}s  ({legacy_time / n * 1e6:.1f} us/equation)")
+    print(f"  deepcopy template  {new_time:8.3f}s  ({new_time / n * 1e6:.1f} us/equation)")
+    print(f"  speedup            {legacy_time / new_time:8.1f}x")
+
+
+def bench_layout(sheet, repeat):
+    conv = load_converter()
+    records = conv.build_paragraph_ir(Document(sheet))
+    mcqs, _ = conv.extract_mcqs(records)
+    if not mcqs:
+        print(f"{os.path.basename(sheet)} has no MCQs.")
+        return
+    per_mcq_time, per_mcq = _time(lambda: [[conv.get_option_length_class(m['options_meta']) for m in mcqs]
+                                           for _ in range(repeat)][-1])
+    matrix_time, (lengths, present) = _time(lambda: [conv.option_length_matrix(mcqs) for _ in range(repeat)][-1])
+    classify_time, batch = _time(lambda: [conv.classify_option_layouts(lengths, present) for _ in range(repeat)][-1])
+    assert per_mcq == batch
+    print(f"{os.path.basename(sheet)}: {len(mcqs)} MCQs x {repeat}")
+    print(f"  per-MCQ classification   {per_mcq_time:8.3f}s")
+    print(f"  length matrix            {matrix_time:8.3f}s")
+    print(f"  vectorized thresholds    {classify_time:8.4f}s")
+    metrics_time, metrics = _time(conv.load_font_metrics)
+    if metrics is not None:
+        width_time, (widths, present) = _time(lambda: [conv.option_width_matrix(mcqs, metrics) for _ in range(repeat)][-1])
+        layouts = conv.classify_option_layouts(widths, present, conv.ONELINE_OPTION_WIDTH_PT, conv.TWOLINE_OPTION_WIDTH_PT)
+        counts = " / ".join(f"{layouts.count(kind)} {kind}" for kind in ("oneline", "twoline", "fourline"))
+        print(f"  font metrics load        {metrics_time:8.3f}s  (once per process)")
+        print(f"  rendered-width matrix    {width_time:8.3f}s  -> {counts}")
+    # Re-tuning the limits only re-runs the comparisons
+    print(f"  {'short':>5} {'medium':>6}  oneline twoline fourline")
+    for short in (3, 4, 6):
+        for medium in (14, 18, 24):
+            layouts = conv.classify_option_layouts(lengths, present, short, medium)
+            counts = [layouts.count(kind) for kind in ("oneline", "twoline", "fourline")]
+            print(f"  {short:>5} {medium:>6}  {counts[0]:>7} {counts[1]:>7} {counts[2]:>8}")
+
+
+def bench_output(question_counts):
+    """
+    Output generation must stay linear: the per-question cost should not
+    grow with the number of questions already written.
+    """
+    conv = load_converter()
+    print(f"{'questions':>10} {'build_docx (s)':>15} {'per question (ms)':>18}")
+    for count in question_counts:
+        with tempfile.TemporaryDirectory() as tmp:
+            src = os.path.join(tmp, "sheet.docx")
+            build_sample_document(count * len(SAMPLE_MCQ_LINES)).save(src)
+            pipeline = conv.MCQPipeline(src)
+        elapsed, _ = _time(pipeline.build_docx)
+        n = len(pipeline.mcqs)
+        print(f"{n:>10} {elapsed:>15.2f} {elapsed / n * 1e3:>18.3f}")
+
+
+# Run in a fresh interpreter: loads a converter, opens its window, and
+# reports (import seconds, window seconds) instead of entering mainloop.
+_STARTUP_PROBE = """
+import importlib.util, sys, time, tkinter as tk
+start = time.perf_counter()
+spec = importlib.util.spec_from_file_location("gui", sys.argv[1])
+module = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(module)
+imported = time.perf_counter() - start
+
+def first_frame(root, n=0):
+    root.update()
+    print(imported, time.perf_counter() - start)
+    root.destroy()
+
+tk.Tk.mainloop = first_frame
+try:
+    module.main_gui()
+except tk.TclError:  # no display: only the import can be timed
+    print(imported, -1)
+"""
+
+
+def _slowest_imports(importtime_log, top):
+    """Top-level imports from an `-X importtime` log, slowest (cumulative) first."""
+    rows = []
+    for line in importtime_log.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        if not name.startswith("  "):  # nested imports are indented
+            rows.append((int(cumulative) / 1e6, name.strip()))
+    return sorted(rows, reverse=True)[:top]
+
+
+def bench_startup(runs, top):
+    """
+    Time-to-window for the MCQ and CQ GUIs, from interpreter start, with the
+    slowest top-level imports from `-X importtime` so regressions are easy to spot.
+    """
+    for label, path in (("MCQ", CONVERTER_PATH), ("CQ", CQ_CONVERTER_PATH)):
+        timings = []
+        for _ in range(runs):
+            start = time.perf_counter()
+            proc = subprocess.run([sys.executable, "-X", "importtime", "-c", _STARTUP_PROBE, path],
+                                  capture_output=True, text=True, encoding="utf-8")
+            wall = time.perf_counter() - start
+            if proc.returncode != 0:
+                print(f"{label}: probe failed\n{proc.stderr[-2000:]}")
+                break
+            imported, window = (float(x) for x in proc.stdout.split())
+            timings.append((wall, imported, window, proc.stderr))
+        if not timings:
+            continue
+        wall, imported, window, log = min(timings)
+        print(f"{label} GUI ({os.path.basename(path)}), best of {runs}:")
+        print(f"  process wall time   {wall:6.3f}s")
+        print(f"  script import       {imported:6.3f}s")
+        if window < 0:
+            print("  time to window         n/a  (no display; target is checked on the import)")
+            window = imported
+        else:
+            print(f"  time to window      {window:6.3f}s")
+        verdict = "OK" if window <= TIME_TO_WINDOW_TARGET_S else "OVER"
+        print(f"  target              {TIME_TO_WINDOW_TARGET_S:6.3f}s  {verdict}")
+        for seconds, name in _slowest_imports(log, top):
+            print(f"    {seconds:6.3f}s  {name}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmarks for the MCQ converter.")
+    sub = parser.add_subparsers(dest="bench", required=True)
+
+    walk = sub.add_parser("walk", help="Source paragraph walk in convert_file.")
+    walk.add_argument("--sizes", type=int, nargs="+", default=[500, 5000, 50000])
+
+    classify = sub.add_parser("classify", help="MCQ line classification over a real sheet.")
+    classify.add_argument("--sheet", default=DEFAULT_SHEET)
+    classify.add_argument("--repeat", type=int, default=50)
+
+    omml = sub.add_parser("omml", help="Equation insertion on the write path.")
+    omml.add_argument("--sheet", default=DEFAULT_SHEET)
+    omml.add_argument("--repeat", type=int, default=20)
+
+    layout = sub.add_parser("layout", help="Option-layout classification over a real sheet.")
+    layout.add_argument("--sheet", default=DEFAULT_SHEET)
+    layout.add_argument("--repeat", type=int, default=20)
+
+    output = sub.add_parser("output", help="Output generation at growing question counts.")
+    output.add_argument("--questions", type=int, nargs="+", default=[500, 5000])
+
+    startup = sub.add_parser("startup", help="Time-to-window of the MCQ and CQ GUIs (-X importtime).")
+    startup.add_argument("--runs", type=int, default=5)
+    startup.add_argument("--top", type=int, default=8, help="Slowest top-level imports to list")
+
+    args = parser.parse_args()
+    if args.bench == "walk":
+        bench_walk(args.sizes)
+    elif args.bench == "classify":
+        bench_classify(args.sheet, args.repeat)
+    elif args.bench == "omml":
+        bench_omml(args.sheet, args.repeat)
+    elif args.bench == "layout":
+        bench_layout(args.sheet, args.repeat)
+    elif args.bench == "output":
+        bench_output(args.questions)
+    elif args.bench == "startup":
+        bench_startup(args.runs, args.top)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+"""
+Benchmarks for the PDF grayscale converter.
+
+Run from this folder:
+    python benchmark_grayscale.py brighten
+    python benchmark_grayscale.py brighten --dpi 300 --pages 5
+    python benchmark_grayscale.py convert --pdf input.pdf
+"""
+import argparse
+import os
+import tempfile
+import time
+import tracemalloc
+
+import fitz                   # PyMuPDF
+import numpy as np
+
+from pdf_grayscale_converter import (brighten_grayscale, convert_pdf_to_light_grayscale,
+                                     lightness_lut)
+
+DEFAULT_PDF = os.path.join(os.path.dirname(os.path.abspath(__file__)), "input.pdf")
+
+
+def _legacy_brighten(pix, factor):
+    """The float-multiply brighten this module used before the lookup table."""
+    buf = np.frombuffer(pix.samples, dtype=np.uint8)
+    lighter = np.clip(buf * factor, 0, 255).astype(np.uint8)
+    return fitz.Pixmap(fitz.csGRAY, pix.width, pix.height, lighter.tobytes(), False)
+
+
+def _measure(func, *args):
+    """(seconds, peak traced bytes) of one call."""
+    tracemalloc.start()
+    start = time.perf_counter()
+    func(*args)
+    elapsed = time.perf_counter() - start
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return elapsed, peak
+
+
+def bench_brighten(pdf, dpi, pages, factor, repeat):
+    """
+    Brightening one rendered page: the legacy float path against the lookup
+    table applied in place. Peak memory counts Python/NumPy allocations; the
+    legacy path also allocates a second MuPDF pixmap that is not traced.
+    """
+    doc = fitz.open(pdf)
+    lightness_lut(factor)         # build the cached table outside the timing
+    print(f"{'page':>5} {'pixels':>10} {'legacy (ms)':>12} {'lut (ms)':>9} "
+          f"{'legacy peak (MB)':>17} {'lut peak (MB)':>14}")
+    for pno in range(min(pages, doc.page_count)):
+        pix = doc[pno].get_pixmap(dpi=dpi, colorspace=fitz.csGRAY)
+        legacy = min(_measure(_legacy_brighten, pix, factor) for _ in range(repeat))
+        # Each in-place run works on a fresh copy so it never compounds
+        copies = [fitz.Pixmap(fitz.csGRAY, pix.width, pix.height, pix.samples, False)
+                  for _ in range(repeat)]
+        lut = min(_measure(brighten_grayscale, copy, factor) for copy in copies)
+        pixels = pix.width * pix.height
+        print(f"{pno + 1:>5} {pixels:>10} {legacy[0] * 1e3:>12.1f} {lut[0] * 1e3:>9.1f} "
+              f"{legacy[1] / 2**20:>17.1f} {lut[1] / 2**20:>14.2f}")
+        assert _legacy_brighten(pix, factor).samples == copies[0].samples, "LUT output differs"
+
+
+def bench_convert(pdf, dpi, factor, workers):
+    """Whole-file conversion time and output size, raster against native."""
+    print(f"{'mode':>7} {'seconds':>8} {'output (KB)':>12}   source {os.path.getsize(pdf) / 1024:.0f} KB")
+    with tempfile.TemporaryDirectory() as tmp:
+        for mode in ("raster", "native"):
+            out = os.path.join(tmp, f"{mode}.pdf")
+            start = time.perf_counter()
+            convert_pdf_to_light_grayscale(pdf, out, factor, dpi=dpi, workers=workers, mode=mode)
+            elapsed = time.perf_counter() - start
+            print(f"{mode:>7} {elapsed:>8.2f} {os.path.getsize(out) / 1024:>12.0f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmarks for the PDF grayscale converter.")
+    sub = parser.add_subparsers(dest="bench", required=True)
+
+    brighten = sub.add_parser("brighten", help="Per-page brighten: float path vs in-place lookup table.")
+    brighten.add_argument("--pdf", default=DEFAULT_PDF)
+    brighten.add_argument("--dpi", type=int, default=300)
+    brighten.add_argument("--pages", type=int, default=3)
+    brighten.add_argument("--factor", type=float, default=1.9)
+    brighten.add_argument("--repeat", type=int, default=5)
+
+    convert = sub.add_parser("convert", help="Whole-file raster vs native conversion.")
+    convert.add_argument("--pdf", default=DEFAULT_PDF)
+    convert.add_argument("--dpi", type=int, default=144)
+    convert.add_argument("--factor", type=float, default=1.9)
+    convert.add_argument("--workers", type=int, default=None)
+
+    args = parser.parse_args()
+    if args.bench == "brighten":
+        bench_brighten(args.pdf, args.dpi, args.pages, args.factor, args.repeat)
+    elif args.bench == "convert":
+        bench_convert(args.pdf, args.dpi, args.factor, args.workers)
+
+
+if __name__ == "__main__":
+    main()
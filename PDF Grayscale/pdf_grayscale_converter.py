@@ -1,54 +1,709 @@
+import argparse
+import hashlib
+import json
+import os
+import re
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
+
 import fitz                   # PyMuPDF
 import numpy as np
 
-def brighten_grayscale(pix: fitz.Pixmap, factor: float = 1.4) -> fitz.Pixmap:
+# Pages per worker task; small enough to balance cores, large enough that
+# each task's one-off document open and chunk copy stay cheap.
+PAGES_PER_CHUNK = 16
+
+# Pixels mapped per np.take call in brighten_grayscale
+LUT_CHUNK_PIXELS = 1 << 18
+
+# Quality for JPEG-compressed page and image output
+JPEG_QUALITY = 90
+
+# Per-output-folder record of what each output was made from, for skipping
+STATE_FILE = ".grayscale_state.json"
+
+def lightness_curve(gray, factor: float = 1.4, gamma: float = 1.0, levels=(0, 255)):
     """
-    Return a new Pixmap that is the original pixmap brightened in-place.
-    `factor` > 1.0 lightens, < 1.0 darkens.
-    Works only on GRAY pixmaps.
+    The lightening curve for gray levels on 0-255 (a float or an array).
+    `levels` (black point, white point) are stretched to the full range
+    first, then `gamma` > 1.0 lifts the mid-tones, and finally `factor`
+    > 1.0 lightens (< 1.0 darkens) as a straight multiplier.
+    Raises ValueError unless 0 <= black < white <= 255 and gamma > 0.
+    """
+    black, white = levels
+    if not 0 <= black < white <= 255:
+        raise ValueError(f"Levels must satisfy 0 <= black < white <= 255, got {black} and {white}")
+    if not gamma > 0:
+        raise ValueError(f"Gamma must be greater than 0, got {gamma}")
+    gray = np.clip((np.asarray(gray, dtype=np.float64) - black) * 255.0 / (white - black), 0.0, 255.0)
+    if gamma != 1.0:
+        gray = 255.0 * (gray / 255.0) ** (1.0 / gamma)
+    return np.clip(gray * factor, 0.0, 255.0)
+
+@lru_cache(maxsize=64)
+def lightness_lut(factor: float = 1.4, gamma: float = 1.0, levels=(0, 255)) -> np.ndarray:
+    """The lightness_curve as a read-only 256-entry uint8 lookup table."""
+    lut = lightness_curve(np.arange(256), factor, gamma, levels).astype(np.uint8)
+    lut.flags.writeable = False
+    return lut
+
+def brighten_grayscale(pix: fitz.Pixmap, factor: float = 1.4,
+                       gamma: float = 1.0, levels=(0, 255)) -> fitz.Pixmap:
+    """
+    Brighten a pixmap in place through a lightness lookup table and return it.
+    `factor` > 1.0 lightens, < 1.0 darkens; see lightness_curve for
+    `gamma` and `levels`. Works only on GRAY pixmaps.
     """
     if pix.n != 1:
         raise ValueError("Expected a grayscale pixmap (n == 1)")
 
-    # Copy pixel bytes to NumPy, scale, clip back to 0-255
-    buf = np.frombuffer(pix.samples, dtype=np.uint8)
-    lighter = np.clip(buf * factor, 0, 255).astype(np.uint8)
+    # View the pixmap's own sample buffer and map every byte through the
+    # table in place: no float copy, no new bytes, no new Pixmap. np.take
+    # widens its indices to intp, so go in cache-sized slices to keep that
+    # temporary small.
+    lut = lightness_lut(factor, gamma, tuple(levels))
+    samples = np.frombuffer(pix.samples_mv, dtype=np.uint8)
+    for start in range(0, samples.size, LUT_CHUNK_PIXELS):
+        block = samples[start:start + LUT_CHUNK_PIXELS]
+        np.take(lut, block, out=block, mode="clip")
+    return pix
 
-    # Re-create a Pixmap from the modified bytes  (note the final `False` = no alpha)
-    return fitz.Pixmap(fitz.csGRAY, pix.width, pix.height, lighter.tobytes(), False)
+def _render_page_range(job) -> bytes:
+    """
+    Worker: renders the given pages of `src_pdf` as lightened grayscale
+    images straight onto new pages, and returns that chunk as PDF bytes.
+    """
+    src_pdf, page_numbers, dpi, curve, compression, jpeg_quality = job
+    doc_in  = fitz.open(src_pdf)       # each process opens its own document
+    doc_out = fitz.open()
+
+    for pno in page_numbers:
+        page = doc_in.load_page(pno)
+
+        # Render the page to a *grayscale* pixmap at chosen resolution
+        pix  = page.get_pixmap(dpi=dpi, colorspace=fitz.csGRAY)
+
+        # Brighten it and place it on a page the size of the original
+        brighten_grayscale(pix, *curve)
+        out_page = doc_out.new_page(width=page.rect.width, height=page.rect.height)
+        if compression == "jpeg":
+            out_page.insert_image(out_page.rect, stream=pix.tobytes("jpeg", jpg_quality=jpeg_quality))
+        else:
+            out_page.insert_image(out_page.rect, pixmap=pix)
+
+    chunk = doc_out.tobytes(deflate=True)
+    doc_in.close()
+    doc_out.close()
+    return chunk
 
 def convert_pdf_to_light_grayscale(src_pdf: str,
                                    dst_pdf: str,
                                    brightness_factor: float = 1.4,
-                                   dpi: int = 144):
-    doc_in  = fitz.open(src_pdf)
+                                   dpi: int = 144,
+                                   workers: int = None,
+                                   mode: str = "raster",
+                                   gamma: float = 1.0,
+                                   levels=(0, 255),
+                                   compression: str = None,
+                                   jpeg_quality: int = JPEG_QUALITY,
+                                   pages=None):
+    """
+    Rasterises every page to lightened grayscale. Page ranges are rendered
+    in parallel processes (`workers`, default: CPU count) and stitched back
+    together in page order. mode="native" converts the PDF's own colours
+    instead, rendering at `dpi` only the pages it cannot convert (see
+    convert_pdf_to_native_grayscale), and returns those page numbers.
+    `compression` is "flate" (default for raster) or "jpeg"; `pages` is an
+    optional list of 0-based page numbers to keep.
+    """
+    if mode == "native":
+        return convert_pdf_to_native_grayscale(src_pdf, dst_pdf, brightness_factor, gamma, levels,
+                                               compression, jpeg_quality, pages, dpi)
+    if mode != "raster":
+        raise ValueError(f"Unknown mode {mode!r}; expected 'raster' or 'native'")
+
+    with fitz.open(src_pdf) as doc_in:
+        page_numbers = list(range(doc_in.page_count)) if pages is None else list(pages)
+
+    workers = workers or os.cpu_count() or 1
+    # Enough chunks to keep every worker busy, but never below one page each
+    chunk_size = max(1, min(PAGES_PER_CHUNK, -(-len(page_numbers) // workers)))
+    curve = (brightness_factor, gamma, tuple(levels))
+    jobs = [(src_pdf, page_numbers[start:start + chunk_size], dpi, curve, compression, jpeg_quality)
+            for start in range(0, len(page_numbers), chunk_size)]
+
     doc_out = fitz.open()              # empty PDF to collect pages
+    pool = ProcessPoolExecutor(max_workers=workers) if workers > 1 and len(jobs) > 1 else None
+    try:
+        # map() yields in submission order, so pages stay in sequence
+        chunks = pool.map(_render_page_range, jobs) if pool else map(_render_page_range, jobs)
+        for chunk in chunks:
+            with fitz.open("pdf", chunk) as part:
+                doc_out.insert_pdf(part)
+    finally:
+        if pool:
+            pool.shutdown()
 
-    for pno in range(doc_in.page_count):
-        page = doc_in.load_page(pno)
+    doc_out.save(dst_pdf, deflate=True)
+    doc_out.close()
 
-        # Render the page to a *grayscale* pixmap at chosen resolution
-        pix  = page.get_pixmap(dpi=dpi, colorspace=fitz.csGRAY)
+# ---- Native mode: rewrite colours, keep vectors ----
 
-        # Brighten it
-        pix_lighter = brighten_grayscale(pix, brightness_factor)
+# A token starts after whitespace or a delimiter (but not '/', which would
+# make it a name such as /K), and ends before whitespace or a delimiter
+_TOKEN_START = rb"(?<![^ \t\r\n\f\x00()<>\[\]{}%])"
+_TOKEN_END = rb"(?=[ \t\r\n\f\x00()<>\[\]{}/%]|$)"
+# The operators that matter when recolouring a content stream, plus the
+# starts of strings and comments so their text is never read as operators.
+# q/Q are only needed to restore sc/scn colour spaces, so streams without
+# sc/scn use the cheaper pattern without them.
+_COLOR_EVENT = re.compile(rb"[(%]|" + _TOKEN_START + rb"(g|G|rg|RG|k|K|sc|scn|SC|SCN|cs|CS|BI|sh)" + _TOKEN_END)
+_STATE_EVENT = re.compile(rb"[(%]|" + _TOKEN_START + rb"(g|G|rg|RG|k|K|sc|scn|SC|SCN|cs|CS|BI|sh|q|Q)" + _TOKEN_END)
+# Operands just before an operator, matched on the reversed look-back window
+# so the match is anchored at the operator (numbers and names read backwards)
+_REVERSED_NUMBERS = re.compile(rb"(?:[ \t\r\n\f\x00]+(?:\d*\.?\d+|\d+\.)[+-]?){1,4}" + _TOKEN_END)
+_REVERSED_NAME = re.compile(rb"[ \t\r\n\f\x00]*[^ \t\r\n\f\x00()<>\[\]{}/%]+/")
+_OPERAND_WINDOW = 96
+_STRING_PAREN = re.compile(rb"(?:[^()\\]|\\.)*([()])", re.S)
+_INLINE_IMAGE_DATA = re.compile(rb"[ \t\r\n\f\x00]ID[ \t\r\n\f\x00]")
+_INLINE_IMAGE_END = re.compile(rb"[ \t\r\n\f\x00]EI(?=[ \t\r\n\f\x00]|$)")
+_INLINE_IMAGE_MASK = re.compile(rb"/(?:IM|ImageMask)\s*true")
+_INLINE_IMAGE_SPACE = re.compile(rb"/(?:CS|ColorSpace)\s*(/[^ \t\r\n\f\x00()<>\[\]{}/%]+)")
+_REFERENCE = r"\d+\s+\d+\s+R"
+# Device colour operators: (DeviceGray equivalent, operand count)
+_GRAY_OPERATOR = {b"g": (b"g", 1), b"rg": (b"g", 3), b"k": (b"g", 4),
+                  b"G": (b"G", 1), b"RG": (b"G", 3), b"K": (b"G", 4)}
 
-        # Wrap the pixmap into a one-page PDF
-        img_pdf = fitz.open()
-        rect    = fitz.Rect(0, 0, pix_lighter.width, pix_lighter.height)
-        img_page = img_pdf.new_page(width=rect.width, height=rect.height)
-        img_page.insert_image(rect, pixmap=pix_lighter)
+class UnsupportedColor(ValueError):
+    """Colour that native mode cannot rewrite as gray; the page is rasterised instead."""
 
-        doc_out.insert_pdf(img_pdf)
+def _to_gray(values):
+    """Device gray (0-1) for 1 (gray), 3 (RGB) or 4 (CMYK) colour components."""
+    if len(values) == 1:
+        return values[0]
+    if len(values) == 3:
+        r, g, b = values
+        return 0.3 * r + 0.59 * g + 0.11 * b
+    c, m, y, k = values
+    return 1.0 - min(1.0, 0.3 * c + 0.59 * m + 0.11 * y + k)
 
-    doc_out.save(dst_pdf)
-    doc_in.close()
-    doc_out.close()
-    print(f"✓ Saved lighter-grayscale PDF as '{dst_pdf}'")
-
-# ---- Example usage ----
-convert_pdf_to_light_grayscale(
-    "input.pdf",
-    "output_light_grayscale.pdf",
-    brightness_factor=1.9   # tweak to taste
-)
+def _format_number(value: float) -> bytes:
+    return (f"{value:.4f}".rstrip("0").rstrip(".") or "0").encode()
+
+def _string_end(data: bytes, pos: int) -> int:
+    """Index just past the literal string whose '(' is at `pos`."""
+    depth, pos = 1, pos + 1
+    while depth:
+        match = _STRING_PAREN.match(data, pos)
+        if match is None:
+            return len(data)
+        depth += 1 if match.group(1) == b"(" else -1
+        pos = match.end()
+    return pos
+
+_DEVICE_SPACES = {"/DeviceGray": 1, "/G": 1, "/DeviceRGB": 3, "/RGB": 3, "/DeviceCMYK": 4, "/CMYK": 4}
+
+def _colorspace_components(doc: fitz.Document, resources: str, name: str):
+    """
+    Colour components of colour space `name` (1, 3 or 4) when it can be
+    rewritten as DeviceGray, else None (Pattern, Separation, Indexed, Lab...).
+    `resources` is the PDF object text of the stream's resource dictionary.
+    """
+    if name in _DEVICE_SPACES:
+        return _DEVICE_SPACES[name]
+    match = re.search(r"/ColorSpace\s*(<<.*?>>|" + _REFERENCE + ")", resources or "", re.S)
+    if not match:
+        return None
+    spaces = match.group(1)
+    if spaces.endswith("R"):
+        spaces = doc.xref_object(int(spaces.split()[0]), compressed=True)
+    entry = re.search(re.escape(name) + r"(?![^\s/\[<(])\s*(\[[^\]]*\]|/\w+|" + _REFERENCE + ")", spaces)
+    if not entry:
+        return None
+    return _resolve_colorspace(doc, entry.group(1))
+
+def _resolve_colorspace(doc: fitz.Document, value: str):
+    """Like _colorspace_components, for a colour space value: a name, an array or a reference."""
+    if value.endswith("R"):
+        value = doc.xref_object(int(value.split()[0]), compressed=True)
+    if value in _DEVICE_SPACES:
+        return _DEVICE_SPACES[value]
+    family = re.match(r"\[\s*(/\w+)\s*(" + _REFERENCE + ")?", value)
+    if not family:
+        return None
+    if family.group(1) == "/CalGray":
+        return 1
+    if family.group(1) == "/CalRGB":
+        return 3
+    if family.group(1) == "/ICCBased" and family.group(2):
+        n = doc.xref_get_key(int(family.group(2).split()[0]), "N")[1]
+        return int(n) if n in ("1", "3", "4") else None
+    return None
+
+def gray_content_stream(data: bytes, factor: float, components,
+                        gamma: float = 1.0, levels=(0, 255)) -> bytes:
+    """
+    Rewrites every colour operator of a content stream to DeviceGray on the
+    lightness_curve. `components(name)` resolves a named colour space to its
+    component count, or None when it cannot be rewritten. Everything else,
+    gray inline images included, is copied byte for byte. Raises
+    UnsupportedColor for colour the stream would otherwise keep: shadings,
+    pattern, spot, indexed and other non-device colour spaces, colour inline
+    images and colour operands that cannot be read.
+    """
+    events = _STATE_EVENT if b"sc" in data or b"SC" in data else _COLOR_EVENT
+    grays = {}                         # operand bytes -> lightened gray, per stream
+    out = []
+    fill = stroke = 1                  # original component counts; None = untouched
+    saved = []
+    pos = last = 0
+    while True:
+        match = events.search(data, pos)
+        if match is None:
+            break
+        op, start, pos = match.group(1), match.start(), match.end()
+        if op is None:
+            if data[start] == 0x28:    # '('
+                pos = _string_end(data, start)
+            else:                      # comment
+                eol = data.find(b"\n", pos)
+                pos = len(data) if eol < 0 else eol
+            continue
+        if op == b"q":
+            saved.append((fill, stroke))
+            continue
+        if op == b"Q":
+            if saved:
+                fill, stroke = saved.pop()
+            continue
+        if op == b"sh":
+            raise UnsupportedColor("shading")
+        if op == b"BI":
+            # Inline image: gray ones and stencil masks are copied through to
+            # the matching EI untouched
+            data_start = _INLINE_IMAGE_DATA.search(data, pos)
+            header = data[pos:data_start.start()] if data_start else b""
+            if not _INLINE_IMAGE_MASK.search(header):
+                space = _INLINE_IMAGE_SPACE.search(header)
+                if space is None or components(space.group(1).decode("latin-1")) != 1:
+                    raise UnsupportedColor("colour inline image")
+            end = _INLINE_IMAGE_END.search(data, data_start.end() if data_start else pos)
+            pos = end.end() if end else len(data)
+            continue
+
+        behind = data[max(0, start - _OPERAND_WINDOW):start][::-1]
+        if op in (b"cs", b"CS"):
+            name = _REVERSED_NAME.match(behind)
+            n = components(name.group()[::-1].strip().decode("latin-1")) if name else None
+            if n is None:
+                raise UnsupportedColor("colour space " + (name.group()[::-1].strip().decode("latin-1")
+                                                          if name else "operand"))
+            if op == b"CS":
+                stroke = n
+            else:
+                fill = n
+            out.append(data[last:start - name.end()])
+            out.append(b"/DeviceGray " + op)
+            last = pos
+            continue
+
+        operands = _REVERSED_NUMBERS.match(behind)
+        if operands is None:
+            raise UnsupportedColor(f"unreadable {op.decode()} operands")
+        numbers = operands.group()[::-1]
+        count = len(numbers.split())
+        if op in _GRAY_OPERATOR:
+            gray_op, expected = _GRAY_OPERATOR[op]
+            if count != expected:
+                raise UnsupportedColor(f"{count} operands for {op.decode()}")
+            if op.isupper():
+                stroke = count
+            else:
+                fill = count
+        else:
+            gray_op = op
+            if count != (stroke if op.isupper() else fill):
+                raise UnsupportedColor(f"{count} operands for {op.decode()}")
+        gray = grays.get(numbers)
+        if gray is None:
+            level = lightness_curve(_to_gray([float(n) for n in numbers.split()]) * 255, factor, gamma, levels)
+            gray = grays[numbers] = _format_number(float(level) / 255)
+        out.append(data[last:start - operands.end()])
+        out.append(gray + b" " + gray_op)
+        last = pos
+    out.append(data[last:])
+    return b"".join(out)
+
+def _gray_image(doc: fitz.Document, xref: int, curve, compression=None, jpeg_quality=JPEG_QUALITY):
+    """
+    Re-encodes image `xref` as lightened DeviceGray: as JPEG or Flate when
+    `compression` says so, otherwise JPEGs stay JPEGs and the rest Flate.
+    """
+    pix = fitz.Pixmap(doc, xref)
+    if pix.alpha:
+        pix = fitz.Pixmap(pix, 0)
+    if pix.n != 1:
+        pix = fitz.Pixmap(fitz.csGRAY, pix)
+    brighten_grayscale(pix, *curve)
+
+    if compression is None:
+        compression = "jpeg" if "DCTDecode" in doc.xref_get_key(xref, "Filter")[1] else "flate"
+    # The old filters (JPX, JBIG2, CCITT...) and their parameters describe
+    # the old data, not the new
+    for key in ("Filter", "DecodeParms", "Decode", "Intent", "SMaskInData"):
+        doc.xref_set_key(xref, key, "null")
+    if compression == "jpeg":
+        doc.update_stream(xref, pix.tobytes("jpeg", jpg_quality=jpeg_quality), compress=False)
+        doc.xref_set_key(xref, "Filter", "/DCTDecode")
+    else:
+        doc.update_stream(xref, pix.samples, compress=True)
+    doc.xref_set_key(xref, "ColorSpace", "/DeviceGray")
+    doc.xref_set_key(xref, "BitsPerComponent", "8")
+
+def _page_tree_xrefs(doc: fitz.Document) -> set:
+    """Xrefs of every page and page-tree node, which _uses_any never walks into."""
+    tree = set()
+    for page in doc:
+        xref = page.xref
+        while xref not in tree:
+            tree.add(xref)
+            parent = doc.xref_get_key(xref, "Parent")
+            if parent[0] != "xref":
+                break
+            xref = int(parent[1].split()[0])
+    return tree
+
+def _uses_any(doc: fitz.Document, page: fitz.Page, resources, targets: set, tree: set, refs: dict) -> bool:
+    """
+    True when `page` draws any of the `targets` xrefs: through its contents,
+    its (possibly inherited) `resources` or its annotations' appearances,
+    following indirect references all the way down. `refs` caches each
+    object's references across pages.
+    """
+    texts = [resources[1], doc.xref_get_key(page.xref, "Contents")[1]]
+    texts += [doc.xref_get_key(annot, "AP")[1] for annot in _annot_xrefs(doc, page)]
+    todo = [int(ref.split()[0]) for text in texts for ref in re.findall(_REFERENCE, text)]
+    seen = set()
+    while todo:
+        xref = todo.pop()
+        if xref in seen or xref in tree:
+            continue
+        if xref in targets:
+            return True
+        seen.add(xref)
+        if xref not in refs:
+            refs[xref] = [int(ref.split()[0]) for ref in re.findall(_REFERENCE, doc.xref_object(xref, compressed=True))]
+        todo.extend(refs[xref])
+    return False
+
+def _annot_xrefs(doc: fitz.Document, page: fitz.Page) -> list:
+    kind, value = doc.xref_get_key(page.xref, "Annots")
+    if kind == "xref":
+        value = doc.xref_object(int(value.split()[0]), compressed=True)
+    return [int(ref.split()[0]) for ref in re.findall(_REFERENCE, value)] if kind != "null" else []
+
+def _rasterise_page(doc: fitz.Document, pno: int, src_page: fitz.Page, dpi: int, curve,
+                    compression=None, jpeg_quality=JPEG_QUALITY):
+    """
+    Replaces page `pno` of `doc` by a lightened grayscale rendering of
+    `src_page`, its colour original. The page object itself is kept, so
+    bookmarks to it still work, and so do its links; other annotations are
+    drawn into the image and removed.
+    """
+    rotation = src_page.rotation
+    src_page.set_rotation(0)           # insert_image places the image on the unrotated page
+    pix = src_page.get_pixmap(dpi=dpi, colorspace=fitz.csGRAY)
+    src_page.set_rotation(rotation)
+    brighten_grayscale(pix, *curve)
+
+    xref = doc[pno].xref
+    links = [f"{annot} 0 R" for annot in _annot_xrefs(doc, doc[pno])
+             if doc.xref_get_key(annot, "Subtype")[1] == "/Link"]
+    for key, value in (("Contents", "null"), ("Resources", "<<>>"), ("Rotate", "0"),
+                       ("Annots", f"[{' '.join(links)}]" if links else "null")):
+        doc.xref_set_key(xref, key, value)
+    page = doc[pno]
+    if compression == "jpeg":
+        page.insert_image(page.rect, stream=pix.tobytes("jpeg", jpg_quality=jpeg_quality))
+    else:
+        page.insert_image(page.rect, pixmap=pix)
+    page.set_rotation(rotation)
+
+def convert_pdf_to_native_grayscale(src_pdf: str,
+                                    dst_pdf: str,
+                                    brightness_factor: float = 1.4,
+                                    gamma: float = 1.0,
+                                    levels=(0, 255),
+                                    compression: str = None,
+                                    jpeg_quality: int = JPEG_QUALITY,
+                                    pages=None,
+                                    dpi: int = 144) -> list:
+    """
+    Converts a PDF to lightened grayscale without rasterising it: colour
+    operators in page and form content become DeviceGray on the
+    lightness_curve, and embedded images are re-encoded in gray.
+    Text stays vector and searchable. Pages that draw colour this cannot
+    rewrite (shadings, patterns, spot or indexed colour, colour inline
+    images, colour-keyed images) are rendered at `dpi` like raster mode
+    instead. Returns the 0-based output page numbers that were rasterised.
+    """
+    src = fitz.open(src_pdf)
+    page_numbers = list(range(src.page_count)) if pages is None else list(pages)
+    doc = fitz.open(src_pdf)
+    if pages is not None:
+        # Keep the subset, then drop what only the other pages used
+        doc.select(page_numbers)
+        doc = fitz.open("pdf", doc.tobytes(garbage=1))
+
+    # Which streams are content, and which resources they see
+    streams, page_resources = {}, []
+    for page in doc:
+        resources = doc.xref_get_key(page.xref, "Resources")
+        if resources[0] == "null":     # inherited from the page tree
+            parent = doc.xref_get_key(page.xref, "Parent")[1]
+            while resources[0] == "null" and parent != "null":
+                parent_xref = int(parent.split()[0])
+                resources = doc.xref_get_key(parent_xref, "Resources")
+                parent = doc.xref_get_key(parent_xref, "Parent")[1]
+        page_resources.append(resources)
+        for xref in page.get_contents():
+            streams[xref] = resources
+    masks, images = set(), []
+    for xref in range(1, doc.xref_length()):
+        subtype = doc.xref_get_key(xref, "Subtype")[1]
+        if subtype == "/Form":
+            streams[xref] = doc.xref_get_key(xref, "Resources")
+        elif subtype == "/Type3":      # glyph procedures may set colours too
+            resources = doc.xref_get_key(xref, "Resources")
+            procs = doc.xref_get_key(xref, "CharProcs")
+            if procs[0] == "xref":
+                procs = ("dict", doc.xref_object(int(procs[1].split()[0]), compressed=True))
+            for ref in re.findall(_REFERENCE, procs[1]):
+                streams[int(ref.split()[0])] = resources
+        elif subtype == "/Image":
+            smask = doc.xref_get_key(xref, "SMask")[1]
+            if smask.endswith("R"):
+                masks.add(int(smask.split()[0]))
+            images.append(xref)
+
+    failed = set()                     # streams and images that would keep their colour
+    for xref, (kind, value) in streams.items():
+        if kind == "xref":
+            value = doc.xref_object(int(value.split()[0]), compressed=True)
+        components = lambda name, res=value: _colorspace_components(doc, res, name)
+        try:
+            doc.update_stream(xref, gray_content_stream(doc.xref_stream(xref), brightness_factor, components,
+                                                         gamma, levels))
+        except UnsupportedColor:
+            failed.add(xref)
+
+    curve = (brightness_factor, gamma, tuple(levels))
+    for xref in images:
+        if xref in masks or doc.xref_get_key(xref, "ImageMask")[1] == "true":
+            continue                   # alpha and stencil masks carry no colour
+        gray = _resolve_colorspace(doc, doc.xref_get_key(xref, "ColorSpace")[1]) == 1
+        if doc.xref_get_key(xref, "Mask")[1].startswith("["):
+            if not gray:               # colour-key ranges are per original component
+                failed.add(xref)
+            continue
+        if gray and doc.xref_get_key(xref, "BitsPerComponent")[1] == "1":
+            continue                   # black and white is unchanged by the curve
+        try:
+            _gray_image(doc, xref, curve, compression, jpeg_quality)
+        except (RuntimeError, ValueError):  # an image MuPDF cannot decode
+            failed.add(xref)
+
+    rasterised = []
+    if failed:
+        tree, refs = _page_tree_xrefs(doc), {}
+        for pno, page in enumerate(doc):
+            if _uses_any(doc, page, page_resources[pno], failed, tree, refs):
+                rasterised.append(pno)
+        for pno in rasterised:
+            _rasterise_page(doc, pno, src[page_numbers[pno]], dpi, curve, compression, jpeg_quality)
+
+    doc.save(dst_pdf, garbage=3, deflate=True, use_objstms=True)
+    doc.close()
+    src.close()
+    return rasterised
+
+# ---- Batch mode ----
+
+def parse_page_selection(text: str, page_count: int) -> list:
+    """0-based page numbers for a 1-based selection such as "1-4,7,10-"."""
+    pages = []
+    for part in text.split(","):
+        first, dash, last = part.strip().partition("-")
+        try:
+            first = int(first) if first else 1
+            last = (int(last) if last else page_count) if dash else first
+        except ValueError:
+            raise ValueError(f"Invalid page selection {part.strip()!r}; expected e.g. 1-4,7,10-")
+        if not 1 <= first <= last <= page_count:
+            raise ValueError(f"Pages {part.strip()} are outside the document's {page_count} pages")
+        pages.extend(range(first - 1, last))
+    return sorted(set(pages))
+
+def _sha256(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+def load_state(out_dir: str) -> dict:
+    """The STATE_FILE record of an output folder ({} when there is none)."""
+    try:
+        with open(os.path.join(out_dir, STATE_FILE), encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+def is_up_to_date(src_pdf: str, dst_pdf: str, settings: dict, record: dict) -> bool:
+    """
+    True when `dst_pdf` exists and was made from this very `src_pdf` with
+    these settings: same size and mtime, or (after a copy or touch) same hash.
+    """
+    if not record or not os.path.exists(dst_pdf) or record.get("settings") != settings:
+        return False
+    if record.get("output") != os.path.abspath(dst_pdf):
+        return False
+    stat = os.stat(src_pdf)
+    if record.get("size") != stat.st_size:
+        return False
+    return record.get("mtime") == stat.st_mtime or record.get("sha256") == _sha256(src_pdf)
+
+def _convert_job(job):
+    """Process-pool entry point; returns (input, output, seconds, error, record)."""
+    src_pdf, dst_pdf, settings, workers = job
+    start = time.perf_counter()
+    try:
+        with fitz.open(src_pdf) as doc:
+            page_count = doc.page_count
+        pages = parse_page_selection(settings["pages"], page_count) if settings["pages"] else None
+        rasterised = convert_pdf_to_light_grayscale(src_pdf, dst_pdf, settings["factor"], settings["dpi"],
+                                                    workers, settings["mode"], settings["gamma"],
+                                                    settings["levels"], settings["compression"],
+                                                    settings["jpeg_quality"], pages)
+        stat = os.stat(src_pdf)
+        record = {"size": stat.st_size, "mtime": stat.st_mtime, "sha256": _sha256(src_pdf),
+                  "output": os.path.abspath(dst_pdf), "settings": settings,
+                  "rasterised_pages": len(rasterised or ())}
+        return src_pdf, dst_pdf, round(time.perf_counter() - start, 2), None, record
+    except Exception as e:
+        return src_pdf, dst_pdf, round(time.perf_counter() - start, 2), str(e), None
+
+def convert_batch(jobs, workers=None):
+    """
+    Converts many PDFs in parallel processes. `jobs` holds (input, output,
+    settings) tuples, settings being _convert_job's keyword dict. A single
+    file spreads its pages over the workers instead.
+    """
+    if len(jobs) == 1:
+        return [_convert_job(jobs[0] + (workers,))]
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        return list(pool.map(_convert_job, [job + (1,) for job in jobs]))
+
+def _collect_pdfs(paths):
+    """The PDFs named by `paths`, expanding folders (not recursively)."""
+    pdfs = []
+    for path in paths:
+        if os.path.isdir(path):
+            pdfs.extend(sorted(entry.path for entry in os.scandir(path)
+                               if entry.is_file() and entry.name.lower().endswith(".pdf")))
+        else:
+            pdfs.append(path)
+    return pdfs
+
+def output_paths(pdfs, out_dir):
+    """
+    (source, output) pairs for `pdfs`, each output named
+    <stem>_light_grayscale.pdf. Sources in different folders keep those
+    folders, relative to their common parent, under `out_dir`, so files
+    with the same name never overwrite each other.
+    """
+    sources = list(dict.fromkeys(os.path.realpath(pdf) for pdf in pdfs))
+    folders = [os.path.dirname(src) for src in sources]
+    try:
+        root = os.path.commonpath(folders) if folders else ""
+    except ValueError:                 # different drives: mirror each full path
+        root = None
+    pairs = []
+    for src, folder in zip(sources, folders):
+        if root is None:
+            drive, rest = os.path.splitdrive(folder)
+            relative = os.path.join(drive.strip(":\\/"), rest.lstrip("\\/"))
+        else:
+            relative = os.path.relpath(folder, root)
+        stem = os.path.splitext(os.path.basename(src))[0]
+        pairs.append((src, os.path.normpath(os.path.join(out_dir, relative, stem + "_light_grayscale.pdf"))))
+    return pairs
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Convert PDFs to lightened grayscale for printing.")
+    parser.add_argument('inputs', nargs='+', help="PDF files and/or folders of PDFs")
+    parser.add_argument('-o', '--out-dir', default="Grayscale", help="Folder for the converted PDFs")
+    parser.add_argument('--mode', choices=["raster", "native"], default="raster",
+                        help="raster: render every page to an image; native: recolour the PDF, keeping text vector")
+    parser.add_argument('--dpi', type=int, default=144,
+                        help="Render resolution in raster mode, and for pages native mode cannot convert")
+    parser.add_argument('--factor', type=float, default=1.9, help="Brightness factor; > 1 lightens")
+    parser.add_argument('--gamma', type=float, default=1.0, help="Mid-tone gamma; > 1 lightens")
+    parser.add_argument('--levels', type=int, nargs=2, default=[0, 255], metavar=("BLACK", "WHITE"),
+                        help="Input black and white points (0-255)")
+    parser.add_argument('--compression', choices=["flate", "jpeg"], default=None,
+                        help="Image compression (default: flate for raster; native keeps JPEGs as JPEGs)")
+    parser.add_argument('--jpeg-quality', type=int, default=JPEG_QUALITY)
+    parser.add_argument('--pages', help="Page subset to keep, e.g. 1-4,7,10-")
+    parser.add_argument('-j', '--workers', type=int, default=None, help="Parallel processes (default: CPU count)")
+    parser.add_argument('--force', action='store_true', help="Convert even when the output is up to date")
+    args = parser.parse_args(argv)
+    if not 0 <= args.levels[0] < args.levels[1] <= 255:
+        parser.error("--levels needs 0 <= BLACK < WHITE <= 255")
+    if not args.gamma > 0:
+        parser.error("--gamma must be greater than 0")
+
+    settings = {"mode": args.mode, "dpi": args.dpi, "factor": args.factor, "gamma": args.gamma,
+                "levels": list(args.levels), "compression": args.compression,
+                "jpeg_quality": args.jpeg_quality, "pages": args.pages}
+
+    os.makedirs(args.out_dir, exist_ok=True)
+    state = load_state(args.out_dir)
+    jobs, skipped = [], 0
+    state_changed = False
+    # State is keyed by each source's resolved path
+    for src_pdf, dst_pdf in output_paths(_collect_pdfs(args.inputs), args.out_dir):
+        if not args.force and os.path.exists(src_pdf) and is_up_to_date(src_pdf, dst_pdf, settings, state.get(src_pdf)):
+            skipped += 1
+            print(f"- {os.path.basename(src_pdf)}: up to date")
+            mtime = os.stat(src_pdf).st_mtime
+            if state[src_pdf]["mtime"] != mtime:
+                # Matched by hash; remember the new mtime so next time is quick
+                state[src_pdf]["mtime"] = mtime
+                state_changed = True
+            continue
+        os.makedirs(os.path.dirname(dst_pdf), exist_ok=True)
+        jobs.append((src_pdf, dst_pdf, settings))
+
+    start = time.perf_counter()
+    results = convert_batch(jobs, args.workers) if jobs else []
+    for src_pdf, dst_pdf, seconds, error, record in results:
+        if error:
+            print(f"✗ {os.path.basename(src_pdf)}: {error}")
+        else:
+            note = f", {record['rasterised_pages']} page(s) rasterised" if record["rasterised_pages"] else ""
+            print(f"✓ {os.path.basename(src_pdf)} -> {dst_pdf} ({seconds}s{note})")
+            state[src_pdf] = record
+    if results or state_changed:
+        with open(os.path.join(args.out_dir, STATE_FILE), "w", encoding="utf-8") as f:
+            json.dump(state, f, indent=1)
+    failed = sum(1 for result in results if result[3])
+    print(f"Converted {len(results) - failed}/{len(results)} PDFs, {skipped} up to date, "
+          f"in {time.perf_counter() - start:.1f}s")
+    return 1 if failed else 0
+
+if __name__ == '__main__':
+    sys.exit(main())
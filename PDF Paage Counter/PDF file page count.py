@@ -1,10 +1,317 @@
-import PyPDF2
+import argparse
+import csv
+import json
 import os
+import re
+import sys
+import time
+import zlib
+from collections import Counter
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, ThreadPoolExecutor, wait
 import tkinter as tk
 from tkinter import filedialog
 
+# Bytes read from the end of a file to find `startxref`
+TAIL_BYTES = 2048
+# Bytes read at an object's offset; grown until its `endobj` is in view
+OBJECT_CHUNK = 4096
+MAX_OBJECT_BYTES = 1 << 20
+# Longest /Prev chain followed before giving up on the fast path
+MAX_XREF_SECTIONS = 256
+
+# Colour detection renders each page this small and calls it colour when
+# enough pixels are clearly off the gray axis (JPEG noise and anti-aliasing
+# stay under the tolerance)
+COLOR_CHECK_DPI = 24
+COLOR_TOLERANCE = 32
+COLOR_MIN_FRACTION = 0.001
+
+# Report cache, kept in the scanned folder unless --cache says otherwise
+CACHE_FILE = ".pdf_page_cache.json"
+
+# Named paper sizes in points (portrait); anything else is reported in mm
+PAPER_SIZES = {
+    "A3": (842, 1191), "A4": (595, 842), "A5": (420, 595), "B5": (499, 709),
+    "Letter": (612, 792), "Legal": (612, 1008), "Demy": (408, 629), "Royal": (459, 684),
+}
+PAPER_TOLERANCE_PT = 3
+
+_STARTXREF = re.compile(rb"startxref\s+(\d+)")
+_SUBSECTION = re.compile(rb"\s*(\d+)\s+(\d+)\s*")
+_TABLE_ENTRY = re.compile(rb"(\d{10}) (\d{5}) ([nf])")
+_OBJECT_HEADER = re.compile(rb"\s*(\d+)\s+(\d+)\s+obj")
+_STREAM_START = re.compile(rb"stream\r?\n")
+
+
+class PdfStructureError(Exception):
+    """The file's xref/trailer can't be read directly; parse it fully instead."""
+
+
+def _ref(pattern, data):
+    """Object number of the first `/Key n g R` matching `pattern`, or None."""
+    match = re.search(pattern + rb"\s+(\d+)\s+\d+\s+R", data)
+    return int(match.group(1)) if match else None
+
+
+def _int(pattern, data):
+    """Direct integer value of `/Key` matching `pattern`; None when it's `n g R`."""
+    # \b stops the lookahead from being dodged by shortening the number:
+    # `/Count 12 0 R` must not read as 1
+    match = re.search(pattern + rb"\s+(\d+)\b(?!\s+\d+\s+R)", data)
+    return int(match.group(1)) if match else None
+
+
+def _png_unpredict(data, columns):
+    """Undoes the PNG row predictors xref streams use (/Predictor >= 10)."""
+    row_size = columns + 1
+    if len(data) % row_size:
+        raise PdfStructureError("xref stream rows don't match /Columns")
+    out, previous = bytearray(), bytes(columns)
+    for start in range(0, len(data), row_size):
+        kind, row = data[start], bytearray(data[start + 1:start + row_size])
+        if kind == 2:                  # Up: the only one writers use for xrefs
+            for i in range(columns):
+                row[i] = (row[i] + previous[i]) & 0xFF
+        elif kind == 1:                # Sub
+            for i in range(1, columns):
+                row[i] = (row[i] + row[i - 1]) & 0xFF
+        elif kind != 0:
+            raise PdfStructureError(f"Unsupported PNG predictor {kind}")
+        out += row
+        previous = row
+    return bytes(out)
+
+
+class _XrefReader:
+    """
+    Looks up just the objects needed to read a page count: the trailer's
+    /Root and its /Pages tree root, through classic xref tables, xref
+    streams and object streams, newest incremental update first.
+    """
+
+    def __init__(self, file):
+        self.file = file
+        self.size = file.seek(0, os.SEEK_END)
+        self.sections = []             # newest first: ("table" | "stream", lookup data, hybrid stream)
+        self.root = None
+        self.encrypted = False
+        self._object_streams = {}
+
+        tail = self._read(max(0, self.size - TAIL_BYTES), TAIL_BYTES)
+        found = _STARTXREF.findall(tail)
+        if not found:
+            raise PdfStructureError("No startxref in the file tail")
+        offset, seen = int(found[-1]), set()
+        while offset is not None and len(seen) < MAX_XREF_SECTIONS:
+            if offset in seen or not 0 <= offset < self.size:
+                raise PdfStructureError(f"Bad xref offset {offset}")
+            seen.add(offset)
+            offset = self._load_section(offset)
+        if self.root is None:
+            raise PdfStructureError("Trailer has no /Root")
+
+    def _read(self, offset, size):
+        self.file.seek(offset)
+        return self.file.read(size)
+
+    def _trailer(self, trailer):
+        """Takes /Root and /Encrypt from the newest trailer; returns /Prev."""
+        if self.root is None:
+            self.root = _ref(rb"/Root", trailer)
+        self.encrypted = self.encrypted or b"/Encrypt" in trailer
+        return _int(rb"/Prev", trailer)
+
+    def _load_section(self, offset):
+        head = self._read(offset, 32)
+        if head.lstrip().startswith(b"xref"):
+            return self._load_table(offset + head.index(b"xref") + 4)
+        return self._load_stream_section(offset)
+
+    def _load_table(self, pos):
+        """Classic table: remembers each subsection's entry offset, reads no entries."""
+        subsections = []
+        while True:
+            chunk = self._read(pos, 64)
+            if chunk.lstrip().startswith(b"trailer"):
+                break
+            match = _SUBSECTION.match(chunk)
+            if not match:
+                raise PdfStructureError("Malformed xref subsection")
+            first, count = int(match.group(1)), int(match.group(2))
+            subsections.append((first, count, pos + match.end()))
+            pos += match.end() + 20 * count   # entries are exactly 20 bytes
+        trailer = self._read(pos, OBJECT_CHUNK)
+        end = trailer.find(b"startxref")
+        trailer = trailer[:end] if end >= 0 else trailer
+        xref_stream = _int(rb"/XRefStm", trailer)
+        prev = self._trailer(trailer)
+        hybrid = None
+        if xref_stream is not None:    # hybrid file: the stream backs the table
+            hybrid = self._stream_section(xref_stream)[0]
+        self.sections.append(("table", subsections, hybrid))
+        return prev
+
+    def _load_stream_section(self, offset):
+        section, dictionary = self._stream_section(offset)
+        self.sections.append(("stream", section, None))
+        return self._trailer(dictionary)
+
+    def _stream_section(self, offset):
+        """Cross-reference stream: decoded now, its entries read on lookup."""
+        dictionary, data = self._stream_at(offset)
+        if b"/XRef" not in dictionary:
+            raise PdfStructureError("startxref points at neither a table nor an xref stream")
+        widths = [int(w) for w in re.search(rb"/W\s*\[([\d\s]+)\]", dictionary).group(1).split()]
+        index = re.search(rb"/Index\s*\[([\d\s]+)\]", dictionary)
+        index = [int(n) for n in index.group(1).split()] if index else [0, _int(rb"/Size", dictionary)]
+        subsections, row = [], 0
+        for first, count in zip(index[::2], index[1::2]):
+            subsections.append((first, count, row))
+            row += count
+        return (widths, subsections, data), dictionary
+
+    def _stream_at(self, offset):
+        """(dictionary bytes, decoded data) of the stream object at `offset`."""
+        chunk = self._read(offset, OBJECT_CHUNK)
+        start = _STREAM_START.search(chunk)
+        if not _OBJECT_HEADER.match(chunk) or not start:
+            raise PdfStructureError(f"No stream object at offset {offset}")
+        dictionary = chunk[:start.start()]
+        length = _int(rb"/Length", dictionary)
+        if length is None:             # indirect /Length: read up to endstream
+            chunk = self._read(offset, MAX_OBJECT_BYTES)
+            end = chunk.find(b"endstream", start.end())
+            if end < 0:
+                raise PdfStructureError("Unterminated stream")
+            raw = chunk[start.end():end].rstrip(b"\r\n")
+        else:
+            raw = self._read(offset + start.end(), length)
+        if self.encrypted and b"/XRef" not in dictionary:
+            raise PdfStructureError("Encrypted object streams need full parsing")
+        filters = re.findall(rb"/(\w+Decode)", dictionary)
+        if filters not in ([], [b"FlateDecode"]):
+            raise PdfStructureError(f"Unsupported stream filter {filters}")
+        data = zlib.decompress(raw) if filters else raw
+        predictor = _int(rb"/Predictor", dictionary)
+        if predictor and predictor >= 10:
+            data = _png_unpredict(data, _int(rb"/Columns", dictionary) or 1)
+        elif predictor and predictor != 1:
+            raise PdfStructureError(f"Unsupported predictor {predictor}")
+        return dictionary, data
+
+    def _entry(self, num):
+        """(1, offset, generation) or (2, object stream, index) for object `num`."""
+        for kind, section, hybrid in self.sections:
+            # The newest section listing the object decides, even when it
+            # lists it free; a hybrid table defers to its stream for that
+            found = self._stream_entry(section, num) if kind == "stream" else self._table_entry(section, num)
+            if not found and hybrid is not None:
+                found = self._stream_entry(hybrid, num) or found
+            if found:
+                return found
+            if found is not None:
+                raise PdfStructureError(f"Object {num} is free in the xref")
+        raise PdfStructureError(f"Object {num} is not in the xref")
+
+    def _table_entry(self, subsections, num):
+        """Entry of `num` in a classic table: a tuple, () when free, None if unlisted."""
+        for first, count, pos in subsections:
+            if first <= num < first + count:
+                match = _TABLE_ENTRY.match(self._read(pos + 20 * (num - first), 20))
+                if not match:
+                    raise PdfStructureError(f"Malformed xref entry for object {num}")
+                if match.group(3) == b"n":
+                    return 1, int(match.group(1)), int(match.group(2))
+                return ()
+        return None
+
+    def _stream_entry(self, section, num):
+        """Entry of `num` in an xref stream: a tuple, () when free, None if unlisted."""
+        widths, subsections, data = section
+        for first, count, row in subsections:
+            if first <= num < first + count:
+                at, fields = (row + num - first) * sum(widths), []
+                for width in widths:
+                    fields.append(int.from_bytes(data[at:at + width], "big") if width else None)
+                    at += width
+                if fields[0] in (None, 1, 2):
+                    return fields[0] or 1, fields[1], fields[2] or 0
+                return ()
+        return None
+
+    def object(self, num):
+        """The body of object `num`, between `obj` and `endobj`."""
+        kind, first, second = self._entry(num)
+        if kind == 2:                  # compressed inside object stream `first`
+            return self._compressed_object(first, num)
+        size = OBJECT_CHUNK
+        while True:
+            chunk = self._read(first, size)
+            header = _OBJECT_HEADER.match(chunk)
+            if not header or int(header.group(1)) != num:
+                raise PdfStructureError(f"Xref offset of object {num} is wrong")
+            end = chunk.find(b"endobj")
+            if end >= 0:
+                return chunk[header.end():end]
+            if size >= MAX_OBJECT_BYTES or first + size >= self.size:
+                raise PdfStructureError(f"Object {num} has no endobj")
+            size *= 4
+
+    def _compressed_object(self, stream_num, num):
+        if stream_num not in self._object_streams:
+            kind, offset, _ = self._entry(stream_num)
+            if kind != 1:
+                raise PdfStructureError("Object stream inside an object stream")
+            dictionary, data = self._stream_at(offset)
+            first = _int(rb"/First", dictionary)
+            numbers = [int(n) for n in data[:first].split()]
+            offsets = {numbers[i]: first + numbers[i + 1] for i in range(0, len(numbers), 2)}
+            self._object_streams[stream_num] = (data, offsets)
+        data, offsets = self._object_streams[stream_num]
+        if num not in offsets:
+            raise PdfStructureError(f"Object {num} is not in object stream {stream_num}")
+        start = offsets[num]
+        later = [o for o in offsets.values() if o > start]
+        return data[start:min(later) if later else len(data)]
+
+    def page_count(self):
+        pages = _ref(rb"/Pages", self.object(self.root))
+        if pages is None:
+            raise PdfStructureError("Catalog has no /Pages")
+        tree = self.object(pages)
+        count = _int(rb"/Count", tree)
+        if count is None:
+            count_ref = _ref(rb"/Count", tree)
+            if count_ref is None:
+                raise PdfStructureError("Page tree root has no /Count")
+            count = int(self.object(count_ref).strip())
+        return count
+
+
+def fast_page_count(pdf_path):
+    """
+    Page count from the trailer, catalog and page-tree root /Count alone,
+    without parsing the rest of the file. Raises PdfStructureError (or
+    OSError) when the structure can't be read that way.
+    """
+    with open(pdf_path, 'rb') as file:
+        try:
+            return _XrefReader(file).page_count()
+        except (ValueError, TypeError, IndexError, AttributeError, zlib.error) as e:
+            raise PdfStructureError(str(e)) from e
+
+
 def get_pdf_page_count(pdf_path):
     try:
+        return fast_page_count(pdf_path)
+    except PdfStructureError:
+        pass                           # broken or unusual file: parse it fully
+    except Exception as e:
+        print(f"Error reading {pdf_path}: {e}")
+        return 0
+    try:
+        import PyPDF2
+
         with open(pdf_path, 'rb') as file:
             pdf_reader = PyPDF2.PdfReader(file)
             return len(pdf_reader.pages)
@@ -12,18 +319,219 @@ def get_pdf_page_count(pdf_path):
         print(f"Error reading {pdf_path}: {e}")
         return 0
 
-def count_pages_in_multiple_pdfs(pdf_folder_path):
-    pdf_page_counts = {}
-    
-    # Loop through all files in the specified directory
-    for filename in os.listdir(pdf_folder_path):
-        if filename.endswith('.pdf'):
-            # Ensure the correct file path format
-            file_path = os.path.join(pdf_folder_path, filename)
-            page_count = get_pdf_page_count(file_path)
-            pdf_page_counts[filename] = page_count
-            
-    return pdf_page_counts
+
+def _list_dir(path, recursive):
+    """([(PDF path, size, mtime)], subfolders) of one folder."""
+    pdfs, folders = [], []
+    try:
+        with os.scandir(path) as entries:
+            for entry in entries:
+                if entry.is_dir(follow_symlinks=False):
+                    if recursive:
+                        folders.append(entry.path)
+                elif entry.name.lower().endswith('.pdf') and entry.is_file():
+                    stat = entry.stat()
+                    pdfs.append((entry.path, stat.st_size, stat.st_mtime))
+    except OSError as e:
+        print(f"Error reading {path}: {e}")
+    return pdfs, folders
+
+
+def _walk_pdfs(pool, pdf_folder_path, recursive):
+    """
+    Yields (path, size, mtime) of every PDF under a folder, in no particular
+    order, as `pool` lists the folders in parallel. Callers may submit their
+    own work to the same pool while walking.
+    """
+    listings = {pool.submit(_list_dir, pdf_folder_path, recursive)}
+    while listings:
+        done, listings = wait(listings, return_when=FIRST_COMPLETED)
+        for listing in done:
+            pdfs, folders = listing.result()
+            for folder in folders:
+                listings.add(pool.submit(_list_dir, folder, recursive))
+            yield from pdfs
+
+
+def find_pdfs(pdf_folder_path, recursive=True, workers=None):
+    """Sorted (path, size, mtime) of every PDF under a folder, listed on a thread pool."""
+    workers = workers or min(32, (os.cpu_count() or 1) * 4)
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        return sorted(_walk_pdfs(pool, pdf_folder_path, recursive))
+
+
+def count_pages_in_multiple_pdfs(pdf_folder_path, recursive=True, workers=None):
+    """
+    Page counts of every PDF under `pdf_folder_path`, keyed by path relative
+    to it. Folder listings and page counts share one thread pool, so slow
+    (network) disks are read in parallel.
+    """
+    workers = workers or min(32, (os.cpu_count() or 1) * 4)
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        counts = {file_path: pool.submit(get_pdf_page_count, file_path)
+                  for file_path, _, _ in _walk_pdfs(pool, pdf_folder_path, recursive)}
+        return {os.path.relpath(file_path, pdf_folder_path): counts[file_path].result()
+                for file_path in sorted(counts)}
+
+
+# --- Print-job report ---
+
+def paper_name(width, height):
+    """A PAPER_SIZES name for a page size in points, else "W x H mm"."""
+    short, long = sorted((width, height))
+    for name, (w, h) in PAPER_SIZES.items():
+        if abs(short - w) <= PAPER_TOLERANCE_PT and abs(long - h) <= PAPER_TOLERANCE_PT:
+            return name
+    return f"{width * 25.4 / 72:.0f} x {height * 25.4 / 72:.0f} mm"
+
+
+def _is_color_page(page):
+    import fitz
+    import numpy as np
+
+    pix = page.get_pixmap(dpi=COLOR_CHECK_DPI, colorspace=fitz.csRGB, alpha=False)
+    rgb = np.frombuffer(pix.samples, dtype=np.uint8).reshape(-1, 3).astype(np.int16)
+    chroma = np.maximum(np.abs(rgb[:, 0] - rgb[:, 1]), np.abs(rgb[:, 1] - rgb[:, 2]))
+    return np.count_nonzero(chroma > COLOR_TOLERANCE) > COLOR_MIN_FRACTION * len(chroma)
+
+
+def inspect_pdf(pdf_path, detect_color=True):
+    """
+    Report record of one PDF: page count, pages per paper size and, when
+    `detect_color`, how many pages print in colour.
+    """
+    record = {"pages": 0, "color_pages": None, "page_sizes": {}, "error": None}
+    try:
+        import fitz
+
+        with fitz.open(pdf_path) as doc:
+            sizes = Counter()
+            color_pages = 0
+            for page in doc:
+                sizes[paper_name(page.rect.width, page.rect.height)] += 1
+                if detect_color and _is_color_page(page):
+                    color_pages += 1
+            record["pages"] = doc.page_count
+            record["page_sizes"] = dict(sizes.most_common())
+            record["color_pages"] = color_pages if detect_color else None
+    except Exception as e:
+        record["error"] = str(e)
+        record["pages"] = get_pdf_page_count(pdf_path)
+    return record
+
+
+def _inspect_job(job):
+    return inspect_pdf(*job)
+
+
+def load_cache(cache_path):
+    try:
+        with open(cache_path, encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def build_report(pdf_folder_path, recursive=True, workers=None, detect_color=True, cache_path=None):
+    """
+    (file rows, folder totals) for every PDF under a folder. Records are
+    cached by (path, size, mtime) in `cache_path`, so only new or changed
+    files are opened; those are inspected in parallel processes. Files
+    that failed are never cached, so they are retried on the next run.
+    """
+    cache_path = cache_path or os.path.join(pdf_folder_path, CACHE_FILE)
+    cache = load_cache(cache_path)
+    pdfs = find_pdfs(pdf_folder_path, recursive, workers)
+
+    records, stale = {}, []
+    for path, size, mtime in pdfs:
+        key = os.path.abspath(path)
+        cached = cache.get(key)
+        if (cached and not cached["error"] and cached["size"] == size and cached["mtime"] == mtime
+                and not (detect_color and cached["color_pages"] is None)):
+            records[path] = cached
+        else:
+            stale.append((path, size, mtime))
+
+    if stale:
+        jobs = [(path, detect_color) for path, _, _ in stale]
+        processes = workers or os.cpu_count() or 1
+        if len(jobs) == 1 or processes == 1:
+            results = list(map(_inspect_job, jobs))
+        else:
+            with ProcessPoolExecutor(max_workers=processes) as pool:
+                results = list(pool.map(_inspect_job, jobs, chunksize=max(1, len(jobs) // (8 * processes))))
+        for (path, size, mtime), record in zip(stale, results):
+            record.update(size=size, mtime=mtime)
+            records[path] = record
+            # A failure may be transient (file locked or still copying)
+            if record["error"]:
+                cache.pop(os.path.abspath(path), None)
+            else:
+                cache[os.path.abspath(path)] = record
+
+    # Forget files that have gone from this folder; keep other folders' entries
+    prefix = os.path.join(os.path.abspath(pdf_folder_path), "")
+    present = {os.path.abspath(path) for path, _, _ in pdfs}
+    gone = [key for key in cache if key.startswith(prefix) and key not in present]
+    for key in gone:
+        del cache[key]
+    if stale or gone:
+        try:
+            with open(cache_path, 'w', encoding='utf-8') as f:
+                json.dump(cache, f)
+        except OSError as e:
+            print(f"Could not save the cache {cache_path}: {e}")
+
+    rows, totals = [], {}
+    for path, size, _ in pdfs:
+        record = records[path]
+        relative = os.path.relpath(path, pdf_folder_path)
+        folder = os.path.dirname(relative) or "."
+        color = record["color_pages"]
+        rows.append({
+            "file": relative,
+            "folder": folder,
+            "pages": record["pages"],
+            "color_pages": color,
+            "grayscale_pages": None if color is None else record["pages"] - color,
+            "page_sizes": "; ".join(f"{name} x{count}" for name, count in record["page_sizes"].items()),
+            "bytes": size,
+            "error": record["error"] or "",
+        })
+        # Every folder's totals include all the files beneath it; "." is the grand total
+        parts = folder.split(os.sep) if folder != "." else []
+        for depth in range(len(parts) + 1):
+            key = os.path.join(*parts[:depth]) if depth else "."
+            total = totals.setdefault(key, {"folder": key, "files": 0, "pages": 0,
+                                            "color_pages": 0, "grayscale_pages": 0, "bytes": 0})
+            total["files"] += 1
+            total["pages"] += record["pages"]
+            total["bytes"] += size
+            if color is not None:
+                total["color_pages"] += color
+                total["grayscale_pages"] += record["pages"] - color
+    return rows, [totals[key] for key in sorted(totals)]
+
+
+def write_report(rows, totals, report_path):
+    """
+    Writes the report as JSON ({"files", "folders"}) or as two CSVs: the
+    per-file rows in `report_path` and the folder totals beside it.
+    """
+    if report_path.lower().endswith('.json'):
+        with open(report_path, 'w', encoding='utf-8') as f:
+            json.dump({"files": rows, "folders": totals}, f, ensure_ascii=False, indent=1)
+        return [report_path]
+    totals_path = os.path.splitext(report_path)[0] + "_folders.csv"
+    for path, table in ((report_path, rows), (totals_path, totals)):
+        # utf-8-sig so Excel shows Bangla file names correctly
+        with open(path, 'w', encoding='utf-8-sig', newline='') as f:
+            writer = csv.DictWriter(f, fieldnames=list(table[0]) if table else ["file"])
+            writer.writeheader()
+            writer.writerows(table)
+    return [report_path, totals_path]
+
 
 def select_folder():
     root = tk.Tk()
@@ -31,14 +539,45 @@ def select_folder():
     folder_path = filedialog.askdirectory(title="Select Folder Containing PDFs")
     return folder_path
 
-# Example Usage
-folder_path = select_folder()  # Open folder selection dialog
 
-if folder_path:
-    page_counts = count_pages_in_multiple_pdfs(folder_path)
-    
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Count the pages of every PDF in a folder. Run without arguments to pick the folder.")
+    parser.add_argument('folder', nargs='?', help="Folder containing PDFs")
+    parser.add_argument('--no-recursive', dest='recursive', action='store_false',
+                        help="Only count PDFs directly inside the folder")
+    parser.add_argument('-j', '--workers', type=int, default=None,
+                        help="Threads for counting (default: 4 per CPU, up to 32); processes for the report")
+    parser.add_argument('-r', '--report', help="Write a print-job report to this .csv or .json file")
+    parser.add_argument('--no-color', dest='detect_color', action='store_false',
+                        help="Skip colour/grayscale detection in the report (faster)")
+    parser.add_argument('--cache', help=f"Report cache file (default: {CACHE_FILE} in the folder)")
+    args = parser.parse_args(argv)
+
+    folder_path = args.folder or select_folder()  # Open folder selection dialog
+    if not folder_path:
+        print("No folder selected.")
+        return 1
+
+    start = time.perf_counter()
+    if args.report:
+        rows, totals = build_report(folder_path, args.recursive, args.workers, args.detect_color, args.cache)
+        for total in totals:
+            color = f", {total['color_pages']} colour" if args.detect_color else ""
+            print(f"{total['folder']}: {total['files']} PDFs, {total['pages']} pages{color}")
+        written = write_report(rows, totals, args.report)
+        print(f"Report saved to {', '.join(written)} in {time.perf_counter() - start:.2f}s")
+        return 0
+
+    page_counts = count_pages_in_multiple_pdfs(folder_path, args.recursive, args.workers)
+
     # Print the page count for each PDF
     for pdf, pages in page_counts.items():
         print(f'{pdf}: {pages} pages')
-else:
-    print("No folder selected.")
+    print(f"{len(page_counts)} PDFs, {sum(page_counts.values())} pages "
+          f"in {time.perf_counter() - start:.2f}s")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,30 @@
+"""Same-named chapter files in a manifest get their own stamped output."""
+import json
+import os
+import sys
+
+import fitz
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "Automated Bookmark"))
+
+from Autometed_bookmark import main  # noqa: E402
+
+
+def test_same_named_chapter_files_get_their_own_output(tmp_path):
+    entries = []
+    for chapter in (7, 8):
+        folder = tmp_path / f"ch{chapter:02d}"
+        folder.mkdir()
+        doc = fitz.open()
+        for _ in range(chapter - 5):
+            doc.new_page(width=300, height=400)
+        doc.save(str(folder / "main.pdf"))
+        entries.append({"chapter": chapter, "file": f"ch{chapter:02d}/main.pdf"})
+    manifest = tmp_path / "book.json"
+    manifest.write_text(json.dumps(entries), encoding="utf-8")
+    out_dir = tmp_path / "out"
+
+    assert main(["-m", str(manifest), "-o", str(out_dir), "-j", "1"]) == 0
+    for chapter in (7, 8):
+        with fitz.open(str(out_dir / f"{chapter:02d}_main_stamped.pdf")) as doc:
+            assert doc.page_count == chapter - 5
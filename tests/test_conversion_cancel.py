@@ -0,0 +1,95 @@
+"""Cancelling a GUI conversion must not leave any output files behind."""
+import glob
+import importlib.util
+import os
+import queue
+import threading
+
+from docx import Document
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+MCQ_DIR = os.path.join(ROOT, "Automated Preparation Book (MCQ)", "New folder")
+MCQ_CONVERTER = os.path.join(MCQ_DIR, "Preparation_book_converter v6.6.4 with OMML tkinter v2.2.5.1.py")
+CQ_CONVERTER = os.path.join(ROOT, "Automated Preparation Book (CQ)", "preparation_book_converter_CQ.py")
+
+
+def load_script(name, path):
+    """Imports a script whose file name is not a valid module name."""
+    spec = importlib.util.spec_from_file_location(name, path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def drain(events):
+    items = []
+    while not events.empty():
+        items.append(events.get_nowait())
+    return items
+
+
+def test_mcq_cancel_before_save_writes_nothing(tmp_path, monkeypatch):
+    conv = load_script("mcq_converter", MCQ_CONVERTER)
+    src = sorted(glob.glob(os.path.join(MCQ_DIR, "AP_-_MCQ_Sheet_*.docx")))[0]
+    cancel = threading.Event()
+    build_docx = conv.MCQPipeline.build_docx
+
+    def build_then_cancel(self, *args, **kwargs):
+        outdoc = build_docx(self, *args, **kwargs)
+        cancel.set()  # the user presses Cancel just as the write phase starts
+        return outdoc
+
+    monkeypatch.setattr(conv.MCQPipeline, "build_docx", build_then_cancel)
+    out_file = str(tmp_path / "out.docx")
+    events = queue.Queue()
+    conv.convert_file_worker(src, out_file, ["csv", "json"], events, cancel)
+
+    assert drain(events)[-1] == ("cancelled",)
+    assert os.listdir(tmp_path) == []
+
+
+def test_mcq_cancel_during_export_removes_outputs(tmp_path, monkeypatch):
+    conv = load_script("mcq_converter", MCQ_CONVERTER)
+    src = sorted(glob.glob(os.path.join(MCQ_DIR, "AP_-_MCQ_Sheet_*.docx")))[0]
+    cancel = threading.Event()
+    iter_mcq_rows = conv.iter_mcq_rows
+
+    def rows_then_cancel(mcqs):
+        for i, row in enumerate(iter_mcq_rows(mcqs)):
+            if i == 1:
+                cancel.set()
+            yield row
+
+    monkeypatch.setattr(conv, "iter_mcq_rows", rows_then_cancel)
+    events = queue.Queue()
+    conv.convert_file_worker(src, str(tmp_path / "out.docx"), ["csv", "json"], events, cancel)
+
+    assert drain(events)[-1] == ("cancelled",)
+    assert os.listdir(tmp_path) == []
+
+
+def test_cq_cancel_before_save_writes_nothing(tmp_path, monkeypatch):
+    conv = load_script("cq_converter", CQ_CONVERTER)
+    src = str(tmp_path / "source.docx")
+    doc = Document()
+    for line in ["প্রশ্ন ১. নিচের তথ্যটি পড়ো। [ঢাকা বোর্ড ২০২৩]", "ক. প্রশ্ন এক", "খ. প্রশ্ন দুই",
+                 "গ. প্রশ্ন তিন", "ঘ. প্রশ্ন চার", "উত্তর (ক) উত্তর এক", "উত্তর (খ) উত্তর দুই"]:
+        doc.add_paragraph(line)
+    doc.save(src)
+
+    cancel = threading.Event()
+    build_cq_docx = conv.build_cq_docx
+
+    def build_then_cancel(*args, **kwargs):
+        outdoc = build_cq_docx(*args, **kwargs)
+        cancel.set()
+        return outdoc
+
+    monkeypatch.setattr(conv, "build_cq_docx", build_then_cancel)
+    out_dir = tmp_path / "out"
+    out_dir.mkdir()
+    events = queue.Queue()
+    conv.convert_file_worker(src, str(out_dir / "out.docx"), False, ["csv", "json"], events, cancel)
+
+    assert drain(events)[-1] == ("cancelled",)
+    assert os.listdir(out_dir) == []
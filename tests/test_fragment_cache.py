@@ -0,0 +1,45 @@
+"""Incremental re-conversion must only parse what changed and match a clean build."""
+import zipfile
+
+from docx import Document
+
+from test_conversion_cancel import MCQ_CONVERTER, load_script
+
+conv = load_script("mcq_converter", MCQ_CONVERTER)
+
+
+def write_sheet(path, answers):
+    doc = Document()
+    for serial, answer in enumerate(answers, 1):
+        doc.add_paragraph(f"{serial}. প্রশ্ন {serial}?")
+        for label, text in zip("কখগঘ", ["এক", "দুই", "তিন", answer]):
+            doc.add_paragraph(f"{label}. {text}")
+        doc.add_paragraph("উত্তর: ঘ")
+    doc.save(str(path))
+
+
+def document_xml(path):
+    with zipfile.ZipFile(path) as z:
+        return z.read("word/document.xml")
+
+
+def test_warm_run_parses_only_edited_paragraphs(tmp_path, monkeypatch):
+    src, cache_dir = tmp_path / "sheet.docx", str(tmp_path / "cache")
+    write_sheet(src, ["চার", "পাঁচ", "ছয়"])
+    conv.convert_one(str(src), str(tmp_path / "cold.docx"), cache_dir=cache_dir)
+
+    parse_paragraph, parsed = conv.parse_paragraph, []
+    monkeypatch.setattr(conv, "parse_paragraph", lambda para: parsed.append(para.text) or parse_paragraph(para))
+    conv.convert_one(str(src), str(tmp_path / "warm.docx"), cache_dir=cache_dir)
+    assert parsed == []
+
+    write_sheet(src, ["চার", "সাত", "ছয়"])
+    cache = conv.FragmentCache(cache_dir)
+    pipeline = conv.MCQPipeline(str(src), cache=cache)
+    pipeline.stream_docx(str(tmp_path / "edited.docx"))
+    assert parsed == ["ঘ. সাত"]
+    assert (cache.hits, cache.misses) == (2, 1)
+
+    monkeypatch.setattr(conv, "parse_paragraph", parse_paragraph)
+    conv.convert_one(str(src), str(tmp_path / "clean.docx"), stream=True)
+    assert document_xml(tmp_path / "edited.docx") == document_xml(tmp_path / "clean.docx")
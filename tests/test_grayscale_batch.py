@@ -0,0 +1,39 @@
+"""Batch conversion keeps same-named PDFs from different folders apart."""
+import os
+import sys
+
+import fitz
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "PDF Grayscale"))
+
+from pdf_grayscale_converter import main  # noqa: E402
+
+
+def _make_pdf(path, text):
+    doc = fitz.open()
+    doc.new_page(width=200, height=200).insert_text((20, 100), text)
+    doc.save(path)
+
+
+def test_same_named_pdfs_get_their_own_output_and_state(tmp_path, capsys):
+    for folder in ("a", "b"):
+        (tmp_path / folder).mkdir()
+        _make_pdf(str(tmp_path / folder / "chapter.pdf"), folder)
+    out_dir = tmp_path / "out"
+    args = [str(tmp_path / "a"), str(tmp_path / "b"), "-o", str(out_dir), "-j", "1", "--mode", "native"]
+
+    assert main(args) == 0
+    outputs = {folder: out_dir / folder / "chapter_light_grayscale.pdf" for folder in ("a", "b")}
+    for folder, output in outputs.items():
+        with fitz.open(str(output)) as doc:
+            assert doc[0].get_text().strip() == folder
+
+    capsys.readouterr()
+    assert main(args) == 0
+    assert capsys.readouterr().out.count("up to date") == 3  # two skips plus the summary
+
+    # Changing one source re-converts only that one
+    _make_pdf(str(tmp_path / "b" / "chapter.pdf"), "changed")
+    assert main(args) == 0
+    with fitz.open(str(outputs["b"])) as doc:
+        assert doc[0].get_text().strip() == "changed"
@@ -0,0 +1,37 @@
+"""The lightness curve rejects levels and gamma that have no valid curve."""
+import os
+import sys
+
+import numpy as np
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "PDF Grayscale"))
+
+from pdf_grayscale_converter import lightness_curve, lightness_lut, main  # noqa: E402
+
+
+@pytest.mark.parametrize("levels", [(10, 10), (200, 50), (-1, 255), (0, 256)])
+def test_invalid_levels_are_rejected(levels):
+    with pytest.raises(ValueError):
+        lightness_curve(128, 1.4, 1.0, levels)
+    with pytest.raises(ValueError):
+        lightness_lut(1.4, 1.0, levels)
+
+
+@pytest.mark.parametrize("gamma", [0.0, -1.0])
+def test_invalid_gamma_is_rejected(gamma):
+    with pytest.raises(ValueError):
+        lightness_lut(1.4, gamma)
+
+
+def test_valid_curve_stays_monotonic():
+    lut = lightness_lut(1.0, 1.5, (20, 230))
+    assert lut[0] == 0 and lut[255] == 255
+    assert np.all(np.diff(lut.astype(int)) >= 0)
+
+
+@pytest.mark.parametrize("args", [["--levels", "10", "10"], ["--levels", "200", "50"], ["--gamma", "0"]])
+def test_cli_rejects_invalid_curve(args, tmp_path):
+    with pytest.raises(SystemExit) as exit_info:
+        main(["in.pdf", "-o", str(tmp_path)] + args)
+    assert exit_info.value.code == 2
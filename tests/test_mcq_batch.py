@@ -0,0 +1,25 @@
+"""Batch conversion keeps same-named sheets from different folders apart."""
+import os
+
+from test_conversion_cancel import MCQ_CONVERTER, load_script
+
+conv = load_script("mcq_converter", MCQ_CONVERTER)
+
+
+def test_same_named_sheets_get_their_own_output(tmp_path):
+    sources = []
+    for folder in ("a", "b"):
+        (tmp_path / folder).mkdir()
+        sources.append(str(tmp_path / folder / "Chapter 1.docx"))
+    out_dir = str(tmp_path / "out")
+
+    # The same sheet given twice (e.g. by a folder and a glob) is converted once
+    pairs = conv.output_paths(sources + [os.path.join(str(tmp_path), "a", ".", "Chapter 1.docx")], out_dir)
+    assert [os.path.relpath(out, out_dir) for _, out in pairs] == [
+        os.path.join("a", "Chapter 1_Reformatted.docx"), os.path.join("b", "Chapter 1_Reformatted.docx")]
+
+
+def test_single_folder_outputs_stay_flat(tmp_path):
+    pairs = conv.output_paths([str(tmp_path / "x.docx"), str(tmp_path / "y.docx")], "out")
+    assert [out for _, out in pairs] == [os.path.join("out", "x_Reformatted.docx"),
+                                         os.path.join("out", "y_Reformatted.docx")]
@@ -0,0 +1,90 @@
+"""Native grayscale output must never keep colour, whatever the page draws it with."""
+import os
+import sys
+
+import fitz
+import numpy as np
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "PDF Grayscale"))
+
+from pdf_grayscale_converter import convert_pdf_to_native_grayscale, gray_content_stream  # noqa: E402
+
+# name -> (content stream, resources, needs raster fallback)
+PAGES = {
+    "device colours": (b"1 0 0 rg 0 0 1 RG 10 10 100 100 re B", "<< >>", False),
+    "shading": (b"/Sh0 sh",
+                "<< /Shading << /Sh0 << /ShadingType 2 /ColorSpace /DeviceRGB /Coords [0 0 200 0] "
+                "/Function << /FunctionType 2 /Domain [0 1] /C0 [1 0 0] /C1 [0 0 1] /N 1 >> >> >> >>", True),
+    "separation": (b"/CS0 cs 1 scn 10 10 100 100 re f",
+                   "<< /ColorSpace << /CS0 [/Separation /Spot /DeviceRGB << /FunctionType 2 /Domain [0 1] "
+                   "/C0 [1 1 1] /C1 [1 0 0] /N 1 >>] >> >>", True),
+    "tiling pattern": (b"/Pattern cs /P0 scn 10 10 100 100 re f",
+                       "<< /Pattern << /P0 {pattern} >> >>", True),
+    "colour inline image": (b"q 100 0 0 100 10 10 cm BI /W 1 /H 1 /CS /RGB /BPC 8 ID \xff\x00\x00 EI Q",
+                            "<< >>", True),
+    "gray inline image": (b"q 100 0 0 100 10 10 cm BI /W 1 /H 1 /CS /G /BPC 8 ID \x80 EI Q", "<< >>", False),
+    "indexed 1-bit image": (b"q 100 0 0 100 10 10 cm /Im0 Do Q", "<< /XObject << /Im0 {indexed} >> >>", False),
+    "form": (b"/Fm0 Do", "<< /XObject << /Fm0 {form} >> >>", False),
+}
+
+
+def _add_stream(doc, obj, data):
+    xref = doc.get_new_xref()
+    doc.update_object(xref, obj)
+    doc.update_stream(xref, data)
+    return xref
+
+
+@pytest.fixture
+def colour_pdf(tmp_path):
+    doc = fitz.open()
+    refs = {
+        "pattern": _add_stream(doc, "<< /PatternType 1 /PaintType 1 /TilingType 1 /BBox [0 0 10 10] "
+                                    "/XStep 10 /YStep 10 /Resources << >> >>", b"0 1 0 rg 0 0 5 5 re f"),
+        "indexed": _add_stream(doc, "<< /Type /XObject /Subtype /Image /Width 8 /Height 1 /BitsPerComponent 1 "
+                                    "/ColorSpace [/Indexed /DeviceRGB 1 <ff000000ff00>] >>", b"\xaa"),
+        "form": _add_stream(doc, "<< /Type /XObject /Subtype /Form /BBox [0 0 200 200] "
+                                 "/Resources << >> >>", b"0 0 1 rg 10 10 100 100 re f"),
+    }
+    for name, (content, resources, _) in PAGES.items():
+        page = doc.new_page(width=200, height=200)
+        doc.update_stream(_new_contents(doc, page), content)
+        doc.xref_set_key(page.xref, "Resources",
+                         resources.format(**{key: f"{xref} 0 R" for key, xref in refs.items()}))
+    path = str(tmp_path / "colour.pdf")
+    doc.save(path)
+    return path
+
+
+def _new_contents(doc, page):
+    xref = _add_stream(doc, "<< >>", b"")
+    doc.xref_set_key(page.xref, "Contents", f"{xref} 0 R")
+    return xref
+
+
+def _has_colour(page):
+    pix = page.get_pixmap(dpi=36, colorspace=fitz.csRGB, alpha=False)
+    rgb = np.frombuffer(pix.samples, dtype=np.uint8).reshape(-1, 3).astype(np.int16)
+    return int((rgb.max(axis=1) - rgb.min(axis=1)).max()) > 8
+
+
+def test_native_output_has_no_colour(colour_pdf, tmp_path):
+    with fitz.open(colour_pdf) as src:
+        assert all(_has_colour(page) for page, name in zip(src, PAGES) if not name.startswith("gray"))
+
+    out = str(tmp_path / "gray.pdf")
+    rasterised = convert_pdf_to_native_grayscale(colour_pdf, out, 1.0)
+
+    assert [name for pno, name in enumerate(PAGES) if pno in rasterised] == \
+        [name for name, (_, _, fallback) in PAGES.items() if fallback]
+    with fitz.open(out) as doc:
+        for page, name in zip(doc, PAGES):
+            assert not _has_colour(page), name
+        # Converted pages keep their vector drawing
+        assert doc[0].get_drawings()
+
+
+def test_names_are_not_colour_operators():
+    data = b"/Span << /K 1 /g 2 >> BDC 1 0 0 rg EMC"
+    assert gray_content_stream(data, 1.0, lambda name: None) == b"/Span << /K 1 /g 2 >> BDC 0.3 g EMC"
@@ -0,0 +1,31 @@
+"""English-labelled options must get the layout of their Bangla-labelled twins."""
+import pytest
+from docx import Document
+
+from test_conversion_cancel import MCQ_CONVERTER, load_script
+
+conv = load_script("mcq_converter", MCQ_CONVERTER)
+
+OPTION_TEXTS = ["7" * n for n in range(1, 12)] + ["সাত সংখ্যা এখানে", "একটি অনেক লম্বা উত্তর যা এক লাইনে ধরবে না " * 2]
+
+
+def layouts(label_format, labels):
+    doc = Document()
+    for serial, text in enumerate(OPTION_TEXTS, 1):
+        doc.add_paragraph(f"{serial}. প্রশ্ন?")
+        for label in labels:
+            doc.add_paragraph(label_format.format(label=label, text=text))
+        doc.add_paragraph("উত্তর: ক")
+    mcqs = conv.MCQPipeline("sheet.docx", doc=doc).mcqs
+    assert len(mcqs) == len(OPTION_TEXTS)
+    return [mcq['option_layout'] for mcq in mcqs]
+
+
+@pytest.mark.parametrize("label_format", ["{label}) {text}", "{label}. {text}", "({label}) {text}"])
+def test_english_labels_measure_like_bangla(label_format):
+    if conv.load_font_metrics() is None:
+        pytest.skip("fontTools or the Tiro Bangla fonts are missing")
+    bangla = layouts(label_format, "কখগঘ")
+    assert set(bangla) == {"oneline", "twoline", "fourline"}
+    assert layouts(label_format, "abcd") == bangla
+    assert layouts(label_format, "ABCD") == bangla
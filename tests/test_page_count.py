@@ -0,0 +1,123 @@
+"""The fast page counter must agree with a full parse or refuse to answer."""
+import importlib.util
+import json
+import os
+import zlib
+
+import fitz
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+COUNTER = os.path.join(ROOT, "PDF Paage Counter", "PDF file page count.py")
+
+spec = importlib.util.spec_from_file_location("page_counter", COUNTER)
+counter = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(counter)
+
+
+def build_pdf(objects, sections=None):
+    """
+    Raw PDF from {number: body}. `sections` lists the xref updates oldest
+    first as {number: "n" | "f"}; by default one table lists every object.
+    """
+    data, offsets = b"%PDF-1.4\n", {}
+    for num, body in objects.items():
+        offsets[num] = len(data)
+        data += b"%d 0 obj\n%s\nendobj\n" % (num, body)
+    size = max(objects) + 1
+    prev = None
+    for listing in sections or [{num: "n" for num in objects}]:
+        start = len(data)
+        data += b"xref\n0 1\n0000000000 65535 f \n"
+        for num, state in sorted(listing.items()):
+            offset = offsets[num] if state == "n" else 0
+            data += b"%d 1\n%010d %05d %s \n" % (num, offset, 0 if state == "n" else 1, state.encode())
+        data += b"trailer\n<< /Size %d /Root 1 0 R%s >>\n" % (size, b" /Prev %d" % prev if prev else b"")
+        data += b"startxref\n%d\n%%%%EOF\n" % start
+        prev = start
+    return data
+
+
+def three_pages(count=b"3"):
+    kids = b" ".join(b"%d 0 R" % n for n in (3, 4, 5))
+    objects = {1: b"<< /Type /Catalog /Pages 2 0 R >>",
+               2: b"<< /Type /Pages /Kids [%s] /Count %s >>" % (kids, count)}
+    for n in (3, 4, 5):
+        objects[n] = b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 200 200] >>"
+    return objects
+
+
+def write(tmp_path, data):
+    path = str(tmp_path / "test.pdf")
+    with open(path, "wb") as file:
+        file.write(data)
+    with fitz.open(path) as doc:
+        assert doc.page_count == 3
+    return path
+
+
+def test_indirect_count_is_resolved(tmp_path):
+    objects = three_pages(b"12 0 R")
+    objects[12] = b"3"
+    path = write(tmp_path, build_pdf(objects))
+    assert counter.fast_page_count(path) == 3
+
+
+def test_indirect_stream_length_is_not_truncated(tmp_path):
+    # Catalog and page tree inside an object stream whose /Length is 12 0 R
+    inner = [(1, b"<< /Type /Catalog /Pages 2 0 R >>"), (2, three_pages()[2])]
+    header, body = b"", b""
+    for num, obj in inner:
+        header += b"%d %d " % (num, len(body))
+        body += obj + b"\n"
+    packed = zlib.compress(header + body)
+    objects = {n: obj for n, obj in three_pages().items() if n > 2}
+    objects[6] = (b"<< /Type /ObjStm /N 2 /First %d /Filter /FlateDecode /Length 12 0 R >>\nstream\n%s\nendstream"
+                  % (len(header), packed))
+    objects[12] = b"%d" % len(packed)
+    data = build_pdf(objects)
+    # Point objects 1 and 2 into the object stream with an xref stream
+    start = data.rindex(b"\nxref") + 1
+    offsets = {n: data.index(b"\n%d 0 obj" % n) + 1 for n in objects}
+    rows = [bytes([0, 0, 0, 0])]
+    rows += [bytes([2, 0, 6, i]) for i in range(2)]
+    rows += [bytes([1]) + offsets[n].to_bytes(2, "big") + b"\0" for n in (3, 4, 5, 6)]
+    stream = b"".join(rows)
+    xref = (b"7 0 obj\n<< /Type /XRef /Size 8 /W [1 2 1] /Index [0 7] /Root 1 0 R /Length %d >>\n"
+            b"stream\n%s\nendstream\nendobj\n" % (len(stream), stream))
+    # Object 12 isn't known while the xref stream is read, so the reader must
+    # size the stream by its endstream rather than by a misread `/Length 1`
+    data = data[:start] + xref + b"startxref\n%d\n%%%%EOF\n" % start
+    assert counter.fast_page_count(write(tmp_path, data)) == 3
+
+
+def test_newest_free_entry_hides_older_ones(tmp_path):
+    objects = three_pages()
+    objects[6] = b"<< /Type /Catalog /Pages 2 0 R >>"
+    data = build_pdf(objects, [{num: "n" for num in objects}, {2: "f"}])
+    path = str(tmp_path / "test.pdf")
+    with open(path, "wb") as file:
+        file.write(data)
+    with pytest.raises(counter.PdfStructureError):
+        counter.fast_page_count(path)
+
+
+def test_failed_files_are_not_cached(tmp_path):
+    with fitz.open() as doc:
+        for _ in range(3):
+            doc.new_page()
+        good = doc.tobytes()
+    path = tmp_path / "copying.pdf"
+    path.write_bytes(bytes(len(good)))    # preallocated, not yet copied
+    stat = path.stat()
+    cache = str(tmp_path / "cache.json")
+    rows, _ = counter.build_report(str(tmp_path), workers=1, detect_color=False, cache_path=cache)
+    assert rows[0]["error"]
+    with open(cache) as f:
+        assert json.load(f) == {}
+
+    # Same size and mtime once the copy lands: only a retry sees the pages
+    path.write_bytes(good)
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns))
+    rows, _ = counter.build_report(str(tmp_path), workers=1, detect_color=False, cache_path=cache)
+    assert rows[0]["pages"] == 3 and not rows[0]["error"]